@@ -1,15 +1,28 @@
-import hashlib
+import credentials
+from credentials import LoginThrottledError
 
 class AuthManager:
+    _throttle = credentials.default_throttle()
+
     def __init__(self, db_manager):
         self.db = db_manager
 
     def authenticate(self, username: str, password: str):
+        """
+        Один SELECT на попытку. Старые SHA-256 хеши после успешного входа
+        прозрачно заменяются на scrypt. Частые неудачи по логину блокируются.
+        """
         if not username or not password:
             return None
+        # Логины в БД сравниваются без учета регистра - и счетчик попыток общий для всех написаний
+        login = username.strip().casefold()
+        retry_after = self._throttle.retry_after(login)
+        if retry_after:
+            raise LoginThrottledError(f"Слишком много неудачных попыток. Повторите через {retry_after} с.")
         try:
-            row = self.db.execute_query("SELECT id, username, password_hash, role FROM users WHERE username = ?", (username,), fetchone=True)
+            row = self.db.get_user_credentials(username)
             if not row:
+                self._throttle.failure(login)
                 return None
 
             if isinstance(row, dict):
@@ -23,10 +36,15 @@ class AuthManager:
                 username = row[1]
                 role = row[3] if len(row) > 3 else 'user'
 
-            if hashlib.sha256(password.encode()).hexdigest() == password_hash:
-                return {'id': user_id, 'username': username, 'role': role}
-            else:
+            ok, needs_rehash = credentials.verify_password(password, password_hash)
+            if not ok:
+                self._throttle.failure(login)
                 return None
+
+            self._throttle.success(login)
+            if needs_rehash:
+                self.db.update_password_hash(user_id, credentials.hash_password(password))
+            return {'id': user_id, 'username': username, 'role': role}
         except Exception as e:
             print(f"Ошибка в authenticate: {e}")
             return None
@@ -39,13 +57,12 @@ class AuthManager:
         if len(password) < 4:
             return False, "Пароль должен содержать минимум 4 символа"
         try:
-            if self.db.user_exists(username):
-                return False, "Пользователь с таким именем уже существует"
-            ok = self.db.add_user(username, password, role)
-            if ok:
+            created = self.db.create_user(username, password, role)
+            if created:
                 return True, "Пользователь успешно создан"
-            else:
-                return False, "Ошибка при создании пользователя"
+            if created is False:
+                return False, "Пользователь с таким именем уже существует"
+            return False, "Ошибка при создании пользователя"
         except Exception as e:
             return False, f"Ошибка: {e}"
 
@@ -53,4 +70,4 @@ class AuthManager:
         return self.db.get_all_users()
 
     def delete_user(self, user_id):
-        return self.db.delete_user(user_id)
\ No newline at end of file
+        return self.db.delete_user(user_id)
@@ -0,0 +1,220 @@
+"""
+Бенчмарки горячих путей: чтение, расшифровка, поиск, заполнение таблицы и экспорт.
+
+Данные генерируются синтетически и шифруются тем же ключом, что и в приложении,
+а в качестве сервера используется движок SQLite из storage во временном каталоге.
+
+    python bench.py --sizes 1000,10000,100000 --output bench_results.json
+    python bench.py --compare bench_results.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from database import DatabaseManager
+from exporter import DataExporter
+from migrations import Migrator
+from storage import SQLiteBackend
+
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Соколов", "Михайлов", "Новиков"]
+FIRST_NAMES = ["Иван", "Петр", "Алексей", "Дмитрий", "Сергей", "Андрей", "Мария", "Анна", "Елена", "Ольга"]
+DEPARTMENTS = ["Кафедра физики", "Кафедра математики", "Бухгалтерия", "Отдел кадров", "Деканат ФИТ",
+               "Научная библиотека", "Приемная комиссия", "Кафедра иностранных языков"]
+POSITIONS = ["Профессор", "Доцент", "Старший преподаватель", "Ассистент", "Инженер", "Специалист", "Заведующий"]
+CAMPUSES = ["1", "2", "3", "4", "5", "Главный"]
+SEARCH_QUERIES = [("иван", "all"), ("кафедра", "department"), ("123", "phone"), ("петров а", "fio")]
+
+
+def make_employee(rng, i):
+    fio = f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)}ович"
+    phone = f"+7({rng.randint(900, 999)}){rng.randint(100, 999)}-{rng.randint(10, 99)}-{rng.randint(10, 99)}"
+    return (fio, phone, rng.choice(DEPARTMENTS), rng.choice(POSITIONS), rng.choice(CAMPUSES), str(100 + i % 400))
+
+
+def create_stand_in(path):
+    db = DatabaseManager(storage=SQLiteBackend(path))
+    Migrator(db).migrate()
+    return db
+
+
+def timed(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return {"min": min(samples), "median": statistics.median(samples), "runs": repeat}, result
+
+
+def seed(db, size, rng):
+    rows = [make_employee(rng, i) for i in range(size)]
+    start = time.perf_counter()
+    encrypted = [(db.encrypt_data(f), db.encrypt_data(p), db.encrypt_data(d), db.encrypt_data(pos), c, r)
+                 for f, p, d, pos, c, r in rows]
+    encrypt_time = time.perf_counter() - start
+
+    db._insert_employee_batch(
+        "INSERT INTO employees (fio, phone, department, position, campus, room) VALUES (%s, %s, %s, %s, %s, %s)",
+        encrypted)
+    return {"min": encrypt_time, "median": encrypt_time, "runs": 1}
+
+
+def bench_tk(rows, repeat):
+    """Заполнение виртуальной таблицы и автоподбор колонок; нужен дисплей"""
+    try:
+        import tkinter as tk
+        from tkinter import font as tkfont
+        from virtual_tree import VirtualTreeview, ColumnAutosizer
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"  Tk недоступен, пропуск замеров таблицы: {e}")
+        return {}
+
+    results = {}
+    try:
+        columns = ["id", "fio", "phone", "dept", "pos", "campus", "room"]
+        tree = VirtualTreeview(root, columns=columns, show="headings")
+        results["tree_fill"], _ = timed(lambda: (tree.set_rows(rows), root.update_idletasks()), repeat)
+
+        body_font = tkfont.Font(root=root, family="Segoe UI", size=12)
+        header_font = tkfont.Font(root=root, family="Segoe UI", size=12, weight="bold")
+        autosizer = ColumnAutosizer(columns, body_font, header_font)
+        results["autosize_cold"], _ = timed(lambda: autosizer.compute(rows), 1)
+        results["autosize_warm"], _ = timed(lambda: autosizer.compute(rows), repeat)
+    finally:
+        root.destroy()
+    return results
+
+
+def run_size(size, repeat, rng, workdir):
+    path = os.path.join(workdir, f"bench_{size}.db")
+    db = create_stand_in(path)
+    results = {"encrypt": seed(db, size, rng)}
+
+    def fetch():
+        count = 0
+        for batch in db.iter_employee_batches():
+            count += len(batch)
+        return count
+
+    results["fetch"], _ = timed(fetch, repeat)
+
+    ciphertexts = []
+    for batch in db.iter_employee_batches():
+        for r in batch:
+            ciphertexts.extend((r['fio'], r['phone'], r['department'], r['position']))
+    results["decrypt_serial"], _ = timed(lambda: [db.decrypt_data(v) for v in ciphertexts], repeat)
+    results["decrypt_many"], _ = timed(lambda: db.decrypt_many(ciphertexts), repeat)
+
+    def load_cold():
+        db.invalidate_employee_cache()
+        return db.get_all_employees(force=True)
+
+    results["load_cold"], employees = timed(load_cold, repeat)
+    results["load_warm"], _ = timed(db.get_all_employees, repeat)
+
+    def search():
+        return [len(DatabaseManager.filter_employees(employees, q, f)) for q, f in SEARCH_QUERIES]
+
+    results["filter"], _ = timed(search, repeat)
+    results.update(bench_tk(employees, repeat))
+
+    exporter = DataExporter(db)
+    out_path = os.path.join(workdir, f"bench_{size}.xlsx")
+    results["excel_export"], _ = timed(lambda: exporter.export_to_excel(employees, out_path), 1)
+
+    db.close()
+    db.invalidate_employee_cache()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Возвращает список регрессий: медиана выросла больше чем на threshold"""
+    regressions = []
+    for size, metrics in current["results"].items():
+        old_metrics = baseline.get("results", {}).get(size, {})
+        for name, data in metrics.items():
+            old = old_metrics.get(name)
+            if not old or not old.get("median"):
+                continue
+            ratio = data["median"] / old["median"]
+            marker = "  <-- регрессия" if ratio > 1 + threshold else ""
+            print(f"  {size:>7} {name:<16} {old['median'] * 1000:10.2f} мс -> {data['median'] * 1000:10.2f} мс "
+                  f"(x{ratio:.2f}){marker}")
+            if marker:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки University Phone Book")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Размеры справочника через запятую")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов на каждый замер")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора синтетических данных")
+    parser.add_argument("--output", default="bench_results.json", help="Куда записать результаты (JSON)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое замедление, доля (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    # Базу сравнения читаем до прогона: --output может указывать на тот же файл
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="unicontacts_bench_") as workdir:
+        for size in sizes:
+            print(f"Размер {size}...")
+            rng = random.Random(args.seed)
+            results = run_size(size, args.repeat, rng, workdir)
+            report["results"][str(size)] = results
+            for name, data in results.items():
+                print(f"  {name:<16} {data['median'] * 1000:10.2f} мс")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {os.path.abspath(args.output)}")
+
+    if baseline is not None:
+        print(f"Сравнение с {args.compare}:")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"Найдено регрессий: {len(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import hmac
+import hashlib
+import re
+
+PHONE_CHARS_RE = re.compile(r"^[0-9+\-()\s]+$")
+
+
+class BlindIndex:
+    """
+    Слепой индекс для поиска по зашифрованным полям.
+    Вместо открытого текста в БД хранятся усеченные HMAC от n-грамм,
+    поэтому сервер может фильтровать строки, не видя самих данных.
+    """
+    FIELDS = ("fio", "phone", "department")
+
+    def __init__(self, key: bytes, ngram_size=3, token_length=16):
+        self.key = key
+        self.ngram_size = ngram_size
+        self.token_length = token_length
+
+    def _token(self, field, value):
+        digest = hmac.new(self.key, f"{field}:{value}".encode(), hashlib.sha256).hexdigest()
+        return digest[:self.token_length]
+
+    @staticmethod
+    def normalize(field, text):
+        text = str(text or "")
+        if field == "phone":
+            return "".join(c for c in text if c.isdigit())
+        return " ".join(text.lower().split())
+
+    def ngrams(self, text):
+        n = self.ngram_size
+        if len(text) <= n:
+            return {text} if text else set()
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def phone_token(self, phone):
+        """Токен точного совпадения номера телефона"""
+        return self._token("phone_eq", self.normalize("phone", phone))
+
+    def employee_tokens(self, fio, phone, department):
+        """Список пар (поле, токен) для записи сотрудника"""
+        tokens = []
+        for field, value in (("fio", fio), ("phone", phone), ("department", department)):
+            for gram in self.ngrams(self.normalize(field, value)):
+                tokens.append((field, self._token(field, gram)))
+        tokens.append(("phone_eq", self.phone_token(phone)))
+        return tokens
+
+    def query_tokens(self, field, text):
+        """
+        Токены для поискового запроса по одному полю.
+        None - индекс не применим (слишком короткий запрос),
+        пустое множество - поле заведомо не может содержать запрос.
+        """
+        if field == "phone" and not PHONE_CHARS_RE.match(text):
+            return set()
+        value = self.normalize(field, text)
+        if len(value) < self.ngram_size:
+            return None
+        return {self._token(field, gram) for gram in self.ngrams(value)}
@@ -1,15 +1,24 @@
+"""
+Сборка приложения PyInstaller.
+
+По умолчанию собирается каталог (--onedir): такой exe запускается быстрее,
+потому что не распаковывает все библиотеки во временную папку при каждом старте.
+Единый переносимый файл: python build.py --onefile
+"""
 import PyInstaller.__main__
 import customtkinter
 import os
 import sys
 
+onefile = "--onefile" in sys.argv[1:]
+
 ctk_path = os.path.dirname(customtkinter.__file__)
 path_separator = ';' if os.name == 'nt' else ':'
 
 pyinstaller_args = [
     'main.py',
     '--name=UniversityPhoneBook',
-    '--onefile',
+    '--onefile' if onefile else '--onedir',
     '--noconsole',
     '--windowed',
     f'--add-data=isrgrootx1.pem{path_separator}.',
@@ -0,0 +1,184 @@
+"""
+Консольный интерфейс справочника: поиск, экспорт, импорт и статистика без запуска GUI.
+Модули Tk/CustomTkinter/matplotlib не импортируются, поэтому скрипт подходит для cron
+и серверов без дисплея.
+
+    python cli.py -u admin search "иванов" --field fio
+    python cli.py -u admin export nightly.csv
+    python cli.py -u operator import new_staff.xlsx
+    python cli.py -u admin stats --by department
+    python cli.py -u operator rename-department "Кафедра ИТ" "Кафедра информатики"
+    python cli.py -u operator move-campus 3 "Главный"
+
+Пароль берется из переменной окружения UNICONTACTS_PASSWORD или запрашивается интерактивно.
+"""
+import argparse
+import contextlib
+import csv
+import getpass
+import json
+import os
+import sys
+
+from database import DatabaseManager
+from auth import AuthManager
+from exporter import FIELDS, available_exporters, exporter_for_path
+from stats import StatisticsService
+
+SEARCH_FIELD_CHOICES = ("all", "fio", "phone", "department")
+WRITE_ROLES = ("admin", "operator")
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_AUTH = 3
+
+
+def print_rows(rows, fmt, out):
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(FIELDS)
+        writer.writerows(tuple(r) for r in rows)
+    elif fmt == "jsonl":
+        for r in rows:
+            print(json.dumps(dict(zip(FIELDS, r)), ensure_ascii=False), file=out)
+    else:
+        for r in rows:
+            print("\t".join("" if v is None else str(v) for v in r), file=out)
+
+
+def cmd_search(db, user, args, out):
+    rows = db.search_employees(args.text, args.field)
+    if args.limit:
+        rows = rows[:args.limit]
+    print_rows(rows, args.format, out)
+    print(f"Найдено записей: {len(rows)}", file=sys.stderr)
+    return EXIT_OK
+
+
+def cmd_export(db, user, args, out):
+    rows = None
+    if args.search:
+        rows = db.search_employees(args.search, args.field)
+    success, message = exporter_for_path(args.output, db).export(rows, out_path=args.output)
+    print(message, file=out if success else sys.stderr)
+    return EXIT_OK if success else EXIT_ERROR
+
+
+def cmd_import(db, user, args, out):
+    if user.get("role") not in WRITE_ROLES:
+        print("Недостаточно прав для импорта", file=sys.stderr)
+        return EXIT_AUTH
+    from importer import EmployeeImporter
+    result = EmployeeImporter(db).import_file(args.file)
+    print(result.summary(max_errors=args.max_errors), file=out)
+    return EXIT_OK if not result.errors else EXIT_ERROR
+
+
+def cmd_rename_department(db, user, args, out):
+    if user.get("role") not in WRITE_ROLES:
+        print("Недостаточно прав для изменения записей", file=sys.stderr)
+        return EXIT_AUTH
+    print(f"Изменено записей: {db.rename_department(args.old, args.new)}", file=out)
+    return EXIT_OK
+
+
+def cmd_move_campus(db, user, args, out):
+    if user.get("role") not in WRITE_ROLES:
+        print("Недостаточно прав для изменения записей", file=sys.stderr)
+        return EXIT_AUTH
+    print(f"Изменено записей: {db.move_campus(args.old, args.new)}", file=out)
+    return EXIT_OK
+
+
+def cmd_stats(db, user, args, out):
+    campus_counts, department_counts, _ = StatisticsService(db).counts()
+    total = sum(department_counts.values())
+    counters = {"campus": campus_counts, "department": department_counts}
+    groups = [args.by] if args.by else ["campus", "department"]
+    result = {g: counters[g].most_common() for g in groups}
+    if args.format == "json":
+        print(json.dumps({"total": total, **{g: dict(c) for g, c in result.items()}},
+                         ensure_ascii=False, indent=2), file=out)
+        return EXIT_OK
+    print(f"Всего сотрудников: {total}", file=out)
+    titles = {"campus": "По корпусам", "department": "По отделам"}
+    for g, counts in result.items():
+        print(f"\n{titles[g]}:", file=out)
+        for name, count in counts:
+            print(f"  {count:>6}  {name}", file=out)
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="University Phone Book: консольный режим")
+    parser.add_argument("-u", "--user", default=os.getenv("UNICONTACTS_USER"), help="Логин (или UNICONTACTS_USER)")
+    parser.add_argument("-p", "--password", default=os.getenv("UNICONTACTS_PASSWORD"),
+                        help="Пароль (лучше задать через UNICONTACTS_PASSWORD)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("search", help="Поиск сотрудников")
+    p.add_argument("text", help="Строка поиска (пустая строка - все записи)")
+    p.add_argument("--field", choices=SEARCH_FIELD_CHOICES, default="all")
+    p.add_argument("--format", choices=("table", "csv", "jsonl"), default="table")
+    p.add_argument("--limit", type=int, default=0, help="Вывести не больше N записей")
+    p.set_defaults(func=cmd_search)
+
+    formats = ", ".join(cls.extension for cls in available_exporters())
+    p = sub.add_parser("export", help="Экспорт справочника в файл")
+    p.add_argument("output", help=f"Путь к файлу; формат по расширению ({formats})")
+    p.add_argument("--search", help="Экспортировать только результат поиска")
+    p.add_argument("--field", choices=SEARCH_FIELD_CHOICES, default="all")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="Массовый импорт сотрудников из CSV/XLSX")
+    p.add_argument("file")
+    p.add_argument("--max-errors", type=int, default=50, help="Сколько ошибок показать в отчете")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("stats", help="Статистика по корпусам и отделам")
+    p.add_argument("--by", choices=("campus", "department"))
+    p.add_argument("--format", choices=("table", "json"), default="table")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("rename-department", help="Переименовать отдел у всех сотрудников")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.set_defaults(func=cmd_rename_department)
+
+    p = sub.add_parser("move-campus", help="Перенести всех сотрудников корпуса в другой корпус")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.set_defaults(func=cmd_move_campus)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    username = args.user or input("Логин: ")
+    password = args.password or getpass.getpass("Пароль: ")
+
+    # Данные команды пишут явно в out, а вся диагностика модулей (print) уходит в stderr,
+    # чтобы не смешиваться с выводом при перенаправлении в файл или конвейер
+    out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        db = DatabaseManager()
+        try:
+            connected = db.connect()
+            user = AuthManager(db).authenticate(username, password) if connected else None
+            if not connected:
+                print("Нет подключения к базе данных!", file=sys.stderr)
+                return EXIT_ERROR
+            if not user:
+                print("Неверный логин или пароль", file=sys.stderr)
+                return EXIT_AUTH
+            return args.func(db, user, args, out)
+        except Exception as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return EXIT_ERROR
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
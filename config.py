@@ -5,7 +5,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-USE_MYSQL = True
+# Движок хранения: "mysql" (TiDB Cloud / MySQL) или "sqlite" (локальный файл, сервер не нужен)
+DB_BACKEND = os.getenv("DB_BACKEND", "mysql").lower()
+USE_MYSQL = DB_BACKEND == "mysql"
 
 def resource_path(relative_path):
     try:
@@ -30,4 +32,102 @@ ENCRYPTION_CONFIG = {
     'password': os.getenv("ENCRYPTION_PASSWORD", "default_secret"),
     'salt': os.getenv("ENCRYPTION_SALT", "default_salt").encode(),
     'iterations': 100000
-}
\ No newline at end of file
+}
+
+# Каталог локальных данных приложения (кэш ключа, служебные файлы)
+APP_DATA_DIR = os.getenv("APP_DATA_DIR") or os.path.join(
+    os.getenv("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share"), "UniversityPhoneBook")
+
+# Локальная база для DB_BACKEND=sqlite: файл, размер кэша подготовленных запросов на соединение,
+# ожидание снятия блокировки записи (секунды) и режим синхронизации WAL
+SQLITE_CONFIG = {
+    'path': os.getenv("SQLITE_PATH") or os.path.join(APP_DATA_DIR, "phonebook.db"),
+    'cached_statements': int(os.getenv("SQLITE_CACHED_STATEMENTS", 256)),
+    'busy_timeout': float(os.getenv("SQLITE_BUSY_TIMEOUT", 5)),
+    'synchronous': os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+}
+
+# Локальная реплика сотрудников: чтение с диска, изменения уходят на сервер через очередь (outbox).
+# sync_interval - период фоновой синхронизации (секунды); overlap - запас при повторной выборке
+# изменений, чтобы не пропустить транзакции, зафиксированные с опозданием
+REPLICA_CONFIG = {
+    'enabled': os.getenv("REPLICA_ENABLED", "0") == "1",
+    'path': os.getenv("REPLICA_PATH") or os.path.join(APP_DATA_DIR, "replica.db"),
+    'sync_interval': float(os.getenv("REPLICA_SYNC_INTERVAL", 30)),
+    'overlap': float(os.getenv("REPLICA_OVERLAP", 5)),
+}
+
+# Кэш ключа шифрования, полученного через PBKDF2: повторные запуски не тратят время на вывод ключа.
+# Файл защищен только правами 0600, поэтому вне POSIX-систем кэш по умолчанию выключен
+KEY_CACHE_ENABLED = os.getenv("KEY_CACHE_ENABLED", "1" if os.name == "posix" else "0") == "1"
+KEY_CACHE_PATH = os.path.join(APP_DATA_DIR, "keycache.json")
+
+# Локальная отметка о созданной схеме БД: при совпадении версии запуск не выполняет CREATE TABLE
+SCHEMA_CACHE_PATH = os.path.join(APP_DATA_DIR, "schema_cache.json")
+
+# Сколько разных текстов SQL-запросов хранить в кэше разобранных запросов
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 512))
+
+# Сколько секунд кэш сотрудников считается свежим без проверки версии на сервере
+EMPLOYEE_CACHE_TTL = float(os.getenv("EMPLOYEE_CACHE_TTL", 30))
+
+# Слепой индекс (HMAC n-грамм) для серверного поиска по зашифрованным полям
+USE_BLIND_INDEX = os.getenv("USE_BLIND_INDEX", "0") == "1"
+BLIND_INDEX_NGRAM = int(os.getenv("BLIND_INDEX_NGRAM", 3))
+
+# Пул соединений: размер, проверка простаивающих и пересоздание старых соединений (секунды)
+POOL_CONFIG = {
+    'max_size': int(os.getenv("DB_POOL_SIZE", 5)),
+    'idle_check': float(os.getenv("DB_POOL_IDLE_CHECK", 30)),
+    'max_age': float(os.getenv("DB_POOL_MAX_AGE", 1800)),
+    'timeout': float(os.getenv("DB_POOL_TIMEOUT", 10)),
+}
+
+# Потоки для фоновых запросов к БД из интерфейса
+DB_WORKER_THREADS = int(os.getenv("DB_WORKER_THREADS", 4))
+
+# Задержка поиска после последнего нажатия клавиши (мс)
+SEARCH_DEBOUNCE_MS = int(os.getenv("SEARCH_DEBOUNCE_MS", 300))
+
+# Выше этого числа строк ширина колонок подбирается по самым длинным значениям
+AUTOSIZE_SAMPLE_THRESHOLD = int(os.getenv("AUTOSIZE_SAMPLE_THRESHOLD", 5000))
+
+# Размер пачки при потоковом чтении сотрудников
+EMPLOYEE_BATCH_SIZE = int(os.getenv("EMPLOYEE_BATCH_SIZE", 1000))
+
+# Параллельная расшифровка при массовом чтении: "thread" или "process", число исполнителей и размер пачки
+DECRYPT_CONFIG = {
+    'mode': os.getenv("DECRYPT_MODE", "thread"),
+    'workers': int(os.getenv("DECRYPT_WORKERS", min(4, os.cpu_count() or 1))),
+    'chunk_size': int(os.getenv("DECRYPT_CHUNK_SIZE", 500)),
+}
+
+# Экспорт в Excel: потоковая запись (write-only) и число первых строк для подбора ширины колонок
+EXCEL_STREAMING = os.getenv("EXCEL_STREAMING", "1") == "1"
+EXCEL_WIDTH_SAMPLE = int(os.getenv("EXCEL_WIDTH_SAMPLE", 1000))
+# Размер пачки строк при потоковом экспорте в CSV / JSON Lines / Parquet
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+# Массовый импорт: строк в одном пакетном INSERT (одна транзакция на пачку)
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+
+# Пакетные изменения (DatabaseManager.batch): строк в одном executemany / id в одном DELETE ... IN
+WRITE_CHUNK_SIZE = int(os.getenv("WRITE_CHUNK_SIZE", 500))
+
+# Бюджет холодного старта до появления окна входа, мс; STARTUP_PROFILE=1 печатает этапы запуска всегда
+STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", 800))
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "0") == "1"
+
+# Хеширование паролей: параметры scrypt (n - степень двойки; память ~ 128 * n * r байт)
+SCRYPT_CONFIG = {
+    'n': int(os.getenv("SCRYPT_N", 2 ** 14)),
+    'r': int(os.getenv("SCRYPT_R", 8)),
+    'p': int(os.getenv("SCRYPT_P", 1)),
+}
+
+# Ограничение попыток входа: после max_failures неудач подряд вход по логину блокируется на lockout секунд
+LOGIN_THROTTLE = {
+    'max_failures': int(os.getenv("LOGIN_MAX_FAILURES", 5)),
+    'lockout': int(os.getenv("LOGIN_LOCKOUT", 30)),
+    'max_lockout': 900,
+    'cache_size': 1000,
+}
@@ -0,0 +1,102 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import SCRYPT_CONFIG, LOGIN_THROTTLE
+
+SCHEME = "scrypt"
+
+
+class LoginThrottledError(Exception):
+    pass
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem с запасом: scrypt требует 128 * r * n байт
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n, dklen=32)
+
+
+def hash_password(password):
+    """Хеш пароля в формате scrypt$n$r$p$соль$хеш (соль и хеш в base64)"""
+    n, r, p = SCRYPT_CONFIG['n'], SCRYPT_CONFIG['r'], SCRYPT_CONFIG['p']
+    salt = os.urandom(16)
+    return f"{SCHEME}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def is_legacy_hash(stored):
+    """Старый формат: SHA-256 без соли в hex"""
+    return bool(stored) and "$" not in stored and len(stored) == 64
+
+
+def verify_password(password, stored):
+    """
+    Проверяет пароль. Возвращает (совпадает, нужно_перехешировать): перехеширование нужно
+    для старых SHA-256 хешей и для scrypt с параметрами слабее текущих SCRYPT_CONFIG.
+    """
+    if not stored:
+        return False, False
+    if is_legacy_hash(stored):
+        ok = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        return ok, ok
+    try:
+        scheme, n, r, p, salt, expected = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        if scheme != SCHEME:
+            return False, False
+        actual = _scrypt(password, base64.b64decode(salt), n, r, p)
+        ok = hmac.compare_digest(actual, base64.b64decode(expected))
+    except Exception:
+        return False, False
+    outdated = (n, r, p) != (SCRYPT_CONFIG['n'], SCRYPT_CONFIG['r'], SCRYPT_CONFIG['p'])
+    return ok, ok and outdated
+
+
+class LoginThrottle:
+    """
+    Счетчики неудачных входов по логину в LRU ограниченного размера.
+    После max_failures подряд вход блокируется на lockout секунд, каждая следующая
+    неудача удваивает паузу (не больше max_lockout).
+    """
+    def __init__(self, max_failures=5, lockout=30, max_lockout=900, cache_size=1000):
+        self.max_failures = max_failures
+        self.lockout = lockout
+        self.max_lockout = max_lockout
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def retry_after(self, username):
+        """Сколько секунд осталось до разрешения следующей попытки (0 - можно)"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return 0
+            failures, last_failure = entry
+            if failures < self.max_failures:
+                return 0
+            delay = min(self.lockout * 2 ** (failures - self.max_failures), self.max_lockout)
+            return max(0, int(last_failure + delay - time.monotonic() + 0.999))
+
+    def failure(self, username):
+        with self._lock:
+            failures, _ = self._entries.pop(username, (0, 0.0))
+            self._entries[username] = (failures + 1, time.monotonic())
+            while len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+
+    def success(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
+
+
+def default_throttle():
+    return LoginThrottle(max_failures=LOGIN_THROTTLE['max_failures'], lockout=LOGIN_THROTTLE['lockout'],
+                         max_lockout=LOGIN_THROTTLE['max_lockout'], cache_size=LOGIN_THROTTLE['cache_size'])
@@ -1,30 +1,278 @@
-import pymysql
-import pymysql.cursors
 import os
 import hashlib
 import traceback
 import base64
+import hmac
+import json
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial, lru_cache
 
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from config import (USE_ENCRYPTION, ENCRYPTION_CONFIG, EMPLOYEE_CACHE_TTL,
+                    USE_BLIND_INDEX, BLIND_INDEX_NGRAM, POOL_CONFIG, EMPLOYEE_BATCH_SIZE,
+                    DECRYPT_CONFIG, IMPORT_BATCH_SIZE, KEY_CACHE_ENABLED, KEY_CACHE_PATH,
+                    SCHEMA_CACHE_PATH, QUERY_CACHE_SIZE, WRITE_CHUNK_SIZE)
+from blind_index import BlindIndex
+from pool import ConnectionPool
+from keycache import DerivedKeyCache
+from migrations import Migrator, LATEST_VERSION
+from storage import create_backend
+import credentials
 
-from config import USE_MYSQL, MYSQL_CONFIG, USE_ENCRYPTION, ENCRYPTION_CONFIG
+# Версия схемы БД - номер последней миграции; при ее росте init_database применяет недостающие
+SCHEMA_VERSION = LATEST_VERSION
 
-class DatabaseManager:
+# Битовая маска зашифрованных колонок кортежа сотрудника: fio, phone, department, position
+ENCRYPTED_COLUMNS_MASK = 0b11110
+
+# Индексы колонок кортежа сотрудника, по которым работает поиск
+SEARCH_FIELDS = {
+    "all": (1, 2, 3),
+    "fio": (1,),
+    "phone": (2,),
+    "department": (3,),
+}
+
+# Первые слова запросов, возвращающих строки
+READ_KEYWORDS = ("select", "show", "pragma", "explain", "with")
+
+_worker_cipher = None
+
+
+class Statement:
+    """Разобранный запрос: текст с плейсхолдерами %s и признак чтения"""
+    __slots__ = ("sql", "is_read")
+
+    def __init__(self, sql, is_read):
+        self.sql = sql
+        self.is_read = is_read
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_statement(query):
+    """
+    Приводит плейсхолдеры ? к %s и определяет тип запроса один раз на текст запроса:
+    повторные вызовы с тем же SQL (а параметры всегда передаются отдельно) берутся из кэша.
+    """
+    sql = query.replace("?", "%s") if "?" in query else query
+    return Statement(sql, sql.lstrip()[:8].lower().startswith(READ_KEYWORDS))
+
+
+def _init_decrypt_worker(key):
+    """Инициализатор процесса-расшифровщика: ключ передается один раз"""
+    global _worker_cipher
+    from cryptography.fernet import Fernet
+    _worker_cipher = Fernet(key)
+
+
+def _encrypt_chunk(chunk, cipher=None):
+    cipher = cipher or _worker_cipher
+    return [cipher.encrypt(str(value).encode()).decode() if value else value for value in chunk]
+
+
+def _decrypt_chunk(chunk, cipher=None):
+    cipher = cipher or _worker_cipher
+    result = []
+    for value in chunk:
+        if not value:
+            result.append("")
+            continue
+        try:
+            result.append(cipher.decrypt(str(value).encode()).decode())
+        except Exception:
+            result.append(str(value))
+    return result
+
+
+def advance_signature(signature, emp_id, is_new):
+    """
+    Сигнатура таблицы после записи строки через этот процесс: каждая запись
+    увеличивает row_version на 1, новая строка еще и число строк и максимальный id.
+    """
+    if signature is None:
+        return None
+    count, max_id, versions = signature
+    if is_new:
+        return (count + 1, max(max_id or 0, emp_id), versions + 1)
+    return (count, max_id, versions + 1)
+
+
+class EmployeeCache:
+    """
+    Расшифрованные строки сотрудников, общие для всего процесса.
+    Сигнатура (количество строк, максимальный id, сумма row_version) используется для проверки
+    актуальности: сумма версий меняется при любом изменении строки, в том числе чужим клиентом.
+    """
     def __init__(self):
-        self.connection = None
-        self.cursor = None
-        self.db_type = "mysql" if USE_MYSQL else "sqlite"
+        self.lock = threading.RLock()
+        self.rows = {}
+        self.signature = None
+        self.checked_at = 0.0
+        self.loaded = False
+        self._snapshot = None
+
+    def is_fresh(self):
+        return self.loaded and (time.monotonic() - self.checked_at) < EMPLOYEE_CACHE_TTL
+
+    def load(self, rows, signature):
+        with self.lock:
+            self.rows = {r[0]: r for r in rows}
+            self.signature = signature
+            self.checked_at = time.monotonic()
+            self.loaded = True
+            self._snapshot = None
+
+    def touch(self):
+        with self.lock:
+            self.checked_at = time.monotonic()
+
+    def get_rows(self):
+        with self.lock:
+            if self._snapshot is None:
+                self._snapshot = sorted(self.rows.values(), key=lambda r: r[0])
+            return list(self._snapshot)
+
+    def upsert(self, row):
+        with self.lock:
+            if not self.loaded:
+                return
+            is_new = row[0] not in self.rows
+            self.rows[row[0]] = row
+            self._snapshot = None
+            self.signature = advance_signature(self.signature, row[0], is_new)
+
+    def remove(self, emp_ids):
+        with self.lock:
+            if not self.loaded:
+                return
+            removed = 0
+            for emp_id in emp_ids:
+                if self.rows.pop(emp_id, None) is not None:
+                    removed += 1
+            if removed:
+                self._snapshot = None
+                # Версии удаленных строк неизвестны - при следующей проверке сигнатура не совпадет
+                # и кэш перечитается
+                self.signature = None
+
+    def invalidate(self):
+        with self.lock:
+            self.rows = {}
+            self.signature = None
+            self.loaded = False
+            self._snapshot = None
+
+
+class LazyEmployee:
+    """
+    Строка сотрудника с отложенной расшифровкой.
+    Ведет себя как кортеж (id, fio, phone, department, position, campus, room).
+    """
+    __slots__ = ("_values", "_pending", "_decrypt")
+
+    def __init__(self, raw, decrypt):
+        self._values = [raw['id'], raw['fio'], raw['phone'], raw['department'],
+                        raw['position'], raw['campus'], raw['room']]
+        self._pending = ENCRYPTED_COLUMNS_MASK
+        self._decrypt = decrypt
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in range(*index.indices(len(self._values))))
+        if index < 0:
+            index += len(self._values)
+        bit = 1 << index
+        if self._pending & bit:
+            self._values[index] = self._decrypt(self._values[index])
+            self._pending &= ~bit
+        return self._values[index]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __iter__(self):
+        for i in range(len(self._values)):
+            yield self[i]
+
+    def to_tuple(self):
+        return tuple(self)
+
+    def __repr__(self):
+        return f"LazyEmployee(id={self._values[0]})"
+
+
+def _chunked(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class WriteBatch:
+    """
+    Накопленные изменения сотрудников для DatabaseManager.batch().
+    Повторное изменение одной строки заменяет предыдущее, удаление отменяет изменение.
+    """
+    def __init__(self):
+        self.inserts = []
+        self.updates = {}
+        self.deletes = []
+
+    def add(self, fio, phone, department, position, campus, room):
+        self.inserts.append((fio, phone, department, position, campus, room))
+
+    def update(self, emp_id, fio, phone, department, position, campus, room):
+        emp_id = int(emp_id)
+        # Строка уже удаляется в этой пачке - изменять нечего
+        if emp_id in self.deletes:
+            return
+        self.updates[emp_id] = (fio, phone, department, position, campus, room)
+
+    def delete(self, emp_id):
+        emp_id = int(emp_id)
+        self.updates.pop(emp_id, None)
+        if emp_id not in self.deletes:
+            self.deletes.append(emp_id)
+
+    def __len__(self):
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+
+class DatabaseManager:
+    # Кэш сотрудников общий для менеджеров одной базы (storage.identity), но не разных баз
+    _employee_caches = {}
+    _employee_caches_lock = threading.Lock()
+
+    def __init__(self, storage=None):
+        self.pool = None
+        # Движок хранения (storage.MySQLBackend / storage.SQLiteBackend), по умолчанию из DB_BACKEND
+        self.storage = storage or create_backend()
+        self.db_type = self.storage.name
+        with DatabaseManager._employee_caches_lock:
+            self._employee_cache = DatabaseManager._employee_caches.setdefault(
+                self.storage.identity, EmployeeCache())
+        # Локальная реплика (replica.LocalReplica): если подключена, чтение сотрудников идет с диска
+        self.replica = None
         self._is_connected = False
+        self._lock = threading.RLock()
 
         self.use_encryption = bool(USE_ENCRYPTION)
         self.cipher_suite = None
+        self.blind_index = None
+        self._fernet_key = None
+        self._decrypt_executor = None
+        self._change_listeners = []
         
         if self.use_encryption:
             self.init_encryption()
 
     def init_encryption(self):
+        # cryptography подключается только при включенном шифровании. Импорт вне try:
+        # без библиотеки запуск с USE_ENCRYPTION=True должен падать, а не писать открытый текст
+        from cryptography.fernet import Fernet
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
         try:
             password = ENCRYPTION_CONFIG['password'].encode()
             salt = ENCRYPTION_CONFIG['salt']
@@ -33,14 +281,24 @@ class DatabaseManager:
                 
             iterations = ENCRYPTION_CONFIG.get('iterations', 100000)
 
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=salt,
-                iterations=iterations,
-            )
-            key = base64.urlsafe_b64encode(kdf.derive(password))
-            self.cipher_suite = Fernet(key)
+            key_cache = DerivedKeyCache(KEY_CACHE_PATH) if KEY_CACHE_ENABLED else None
+            raw_key = key_cache.get(password, salt, iterations) if key_cache else None
+            if raw_key is None:
+                kdf = PBKDF2HMAC(
+                    algorithm=hashes.SHA256(),
+                    length=32,
+                    salt=salt,
+                    iterations=iterations,
+                )
+                raw_key = kdf.derive(password)
+                if key_cache:
+                    key_cache.put(password, salt, iterations, raw_key)
+            self._fernet_key = base64.urlsafe_b64encode(raw_key)
+            self.cipher_suite = Fernet(self._fernet_key)
+            # Индекс ведут все клиенты с ключом, независимо от USE_BLIND_INDEX: иначе клиент
+            # без индекса оставлял бы устаревшие токены. Флаг решает только, искать ли по нему
+            index_key = hmac.new(raw_key, b"unicontacts-blind-index", hashlib.sha256).digest()
+            self.blind_index = BlindIndex(index_key, ngram_size=BLIND_INDEX_NGRAM)
         except Exception as e:
             print(f"Ошибка инициализации шифрования: {e}")
             self.use_encryption = False 
@@ -62,102 +320,222 @@ class DatabaseManager:
         except Exception:
             return str(encrypted_data)
 
-    def connect(self):
-        if self._is_connected and self.connection:
-            try:
-                self.connection.ping(reconnect=True)
-                return True
-            except:
-                self._is_connected = False
+    def _open_connection(self):
+        return self.storage.connect()
+
+    def _get_pool(self):
+        with self._lock:
+            if self.pool is None:
+                self.pool = ConnectionPool(
+                    self._open_connection,
+                    max_size=POOL_CONFIG['max_size'],
+                    idle_check=POOL_CONFIG['idle_check'],
+                    max_age=POOL_CONFIG['max_age'],
+                    timeout=POOL_CONFIG['timeout'],
+                    ping=self.storage.ping,
+                )
+            return self.pool
+
+    def _get_decrypt_executor(self):
+        with self._lock:
+            if self._decrypt_executor is None:
+                workers = DECRYPT_CONFIG['workers']
+                if DECRYPT_CONFIG['mode'] == "process":
+                    self._decrypt_executor = ProcessPoolExecutor(
+                        max_workers=workers, initializer=_init_decrypt_worker, initargs=(self._fernet_key,))
+                else:
+                    self._decrypt_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decrypt")
+            return self._decrypt_executor
+
+    def decrypt_many(self, values, chunk_size=None):
+        """
+        Расшифровывает список значений, распределяя пачки по пулу потоков или процессов.
+        Небольшие списки расшифровываются в текущем потоке.
+        """
+        values = list(values)
+        if not self.use_encryption or not self.cipher_suite:
+            return [v if v else "" for v in values]
+
+        return self._map_chunks(_decrypt_chunk, values, chunk_size)
+
+    def encrypt_many(self, values, chunk_size=None):
+        """Шифрует список значений тем же пулом исполнителей, что и decrypt_many"""
+        values = list(values)
+        if not self.use_encryption or not self.cipher_suite:
+            return values
+        return self._map_chunks(_encrypt_chunk, values, chunk_size)
+
+    def _map_chunks(self, func, values, chunk_size=None):
+        chunk_size = chunk_size or DECRYPT_CONFIG['chunk_size']
+        if DECRYPT_CONFIG['workers'] <= 1 or len(values) <= chunk_size:
+            return func(values, self.cipher_suite)
+
+        chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+        executor = self._get_decrypt_executor()
+        if DECRYPT_CONFIG['mode'] == "process":
+            parts = executor.map(func, chunks)
+        else:
+            parts = executor.map(partial(func, cipher=self.cipher_suite), chunks)
+        result = []
+        for part in parts:
+            result.extend(part)
+        return result
 
+    def connect(self):
+        """
+        Проверяет, что пул может выдать соединение. Если в пуле есть
+        недавно использованное соединение, обращения к серверу не происходит.
+        """
         try:
-            print(f"Подключение к TiDB Cloud ({MYSQL_CONFIG['host']})...")
-            self.connection = pymysql.connect(
-                host=MYSQL_CONFIG['host'],
-                port=MYSQL_CONFIG['port'],
-                user=MYSQL_CONFIG['user'],
-                password=MYSQL_CONFIG['password'],
-                database=MYSQL_CONFIG['database'],
-                ssl_ca=MYSQL_CONFIG['ssl_ca'],
-                charset="utf8mb4",
-                cursorclass=pymysql.cursors.DictCursor,
-                autocommit=True
-            )
-            self.cursor = self.connection.cursor()
+            pool = self._get_pool()
+            entry = pool.acquire()
+            pool.release(entry)
             self._is_connected = True
-            print("Успешное подключение!")
-            
             return True
         except Exception as e:
             print(f"Ошибка подключения к БД: {e}")
             self._is_connected = False
             return False
 
+    def attach_replica(self, replica):
+        self.replica = replica
+        self.invalidate_employee_cache()
+        self._notify_change("reset")
+
     def close(self):
-        try:
-            if self.cursor: self.cursor.close()
-            if self.connection: self.connection.close()
-        except Exception:
-            pass
-        finally:
-            self._is_connected = False
-            self.cursor = None
-            self.connection = None
+        if self.replica is not None:
+            self.replica.close()
+        with self._lock:
+            pool, self.pool = self.pool, None
+            executor, self._decrypt_executor = self._decrypt_executor, None
+        if pool is not None:
+            pool.close_all()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._is_connected = False
+
+    def pool_metrics(self):
+        """Счетчики пула: занятые/свободные соединения, ожидания, переподключения"""
+        if self.pool is None:
+            return {}
+        return self.pool.metrics()
 
-    def execute_query(self, query, params=None, fetchone=False, fetchall=False):
-        if not self.connect():
+    def execute_query(self, query, params=None, fetchone=False, fetchall=False, lastrowid=False):
+        """Универсальный вызов: тип запроса (чтение/запись) определяется по его тексту"""
+        statement = compile_statement(query)
+        if statement.is_read:
+            return self._run(statement, params, "one" if fetchone else "all")
+        return self._run(statement, params, "lastrowid" if lastrowid else "write")
+
+    def fetch_one(self, query, params=None):
+        return self._run(compile_statement(query), params, "one")
+
+    def fetch_all(self, query, params=None):
+        return self._run(compile_statement(query), params, "all")
+
+    def execute_write(self, query, params=None, lastrowid=False):
+        """Запись; возвращает True (или id новой строки при lastrowid) либо None при ошибке"""
+        return self._run(compile_statement(query), params, "lastrowid" if lastrowid else "write")
+
+    def _run(self, statement, params, mode):
+        query = statement.sql
+        is_read = mode in ("one", "all")
+        try:
+            pool = self._get_pool()
+        except Exception as e:
+            print(f"Ошибка подключения к БД: {e}")
             return None
+
+        for attempt in range(2):
+            try:
+                entry = pool.acquire()
+            except Exception as e:
+                print(f"Ошибка подключения к БД: {e}")
+                self._is_connected = False
+                return None
+
+            try:
+                with entry.raw.cursor() as cursor:
+                    if params:
+                        cursor.execute(query, params)
+                    else:
+                        cursor.execute(query)
+
+                    # Соединения работают в autocommit: отдельный COMMIT был бы лишним обращением к серверу
+                    if mode == "one":
+                        result = cursor.fetchone()
+                    elif mode == "all":
+                        result = cursor.fetchall()
+                    else:
+                        result = cursor.lastrowid if mode == "lastrowid" else True
+                pool.release(entry)
+                self._is_connected = True
+                return result
+            except self.storage.retryable_errors as e:
+                pool.release(entry, discard=True)
+                # Запрос на чтение или оборванное до отправки соединение безопасно повторить
+                if attempt == 0 and (is_read or self.storage.can_retry(e)):
+                    continue
+                print(f"Ошибка SQL запроса: {e}\nЗапрос: {query}")
+                return None
+            except Exception as e:
+                pool.release(entry)
+                print(f"Ошибка SQL запроса: {e}\nЗапрос: {query}")
+                return None
+
+    def read_query(self, query, params=None, fetchone=False, fetchall=False):
+        """Чтение из таблицы employees: из локальной реплики, если она подключена, иначе с сервера"""
+        if self.replica is not None:
+            return self.replica.read_query(query, params, fetchone=fetchone, fetchall=fetchall)
+        return self.execute_query(query, params, fetchone=fetchone, fetchall=fetchall)
+
+    def _table_columns(self, table):
+        with self._get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"SELECT * FROM {table} WHERE 1 = 0")
+                cursor.fetchall()
+                return {d[0] for d in cursor.description}
+
+    def _schema_cache_key(self):
+        return self.storage.identity
+
+    def _load_schema_cache(self):
         try:
-            if self.db_type == "mysql" and "?" in query:
-                query = query.replace("?", "%s")
+            with open(SCHEMA_CACHE_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
 
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-
-            query_lower = query.strip().lower()
-            if query_lower.startswith(("select", "show")):
-                if fetchone: return self.cursor.fetchone()
-                if fetchall: return self.cursor.fetchall()
-                return self.cursor.fetchall()
-            
-            self.connection.commit()
-            return True
+    def is_schema_cached(self):
+        """Схема этой БД уже создавалась этой версией программы"""
+        return self._load_schema_cache().get(self._schema_cache_key()) == SCHEMA_VERSION
+
+    def remember_schema(self):
+        cache = self._load_schema_cache()
+        cache[self._schema_cache_key()] = SCHEMA_VERSION
+        try:
+            os.makedirs(os.path.dirname(SCHEMA_CACHE_PATH), exist_ok=True)
+            with open(SCHEMA_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
         except Exception as e:
-            print(f"Ошибка SQL запроса: {e}\nЗапрос: {query}")
-            return None
+            print(f"Ошибка записи кэша схемы: {e}")
 
-    def init_database(self):
-        """Создает таблицы с учетом MySQL синтаксиса"""
+    def init_database(self, force=False):
+        """
+        Доводит схему до SCHEMA_VERSION миграциями (migrations.py). Если локальный кэш показывает,
+        что схема этой версии уже применена, обращений к серверу не происходит.
+        """
+        if not force and self.is_schema_cached():
+            return True
         try:
-            create_employees = """
-            CREATE TABLE IF NOT EXISTS employees (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                fio TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                department TEXT NOT NULL,
-                position TEXT NOT NULL,
-                campus VARCHAR(100),
-                room VARCHAR(100)
-            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
-            """
-            
-            create_users = """
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(100) NOT NULL UNIQUE,
-                password_hash VARCHAR(255) NOT NULL,
-                role VARCHAR(50) DEFAULT 'user',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
-            """
-            
-            self.execute_query(create_employees)
-            self.execute_query(create_users)
+            ok = Migrator(self).migrate()
+            if ok and self.blind_index:
+                self.rebuild_blind_index()
 
             self.force_create_test_users()
-            
+
+            if ok:
+                self.remember_schema()
             return True
         except Exception as e:
             print(f"Ошибка при инициализации БД: {e}")
@@ -165,78 +543,570 @@ class DatabaseManager:
 
     def force_create_test_users(self):
         try:
-            if not self.user_exists('admin'):
-                self.add_user('admin', 'admin123', 'admin')
+            if self.create_user('admin', 'admin123', 'admin'):
                 print("Создан пользователь: admin")
-            if not self.user_exists('user'):
-                self.add_user('user', 'user123', 'user')
+            self.create_user('user', 'user123', 'user')
         except Exception as e:
             print(f"Ошибка создания тестовых юзеров: {e}")
 
 
     def hash_password(self, password: str):
-        return hashlib.sha256(password.encode()).hexdigest()
+        return credentials.hash_password(password)
 
     def user_exists(self, username):
-        res = self.execute_query("SELECT id FROM users WHERE username = %s", (username,), fetchone=True)
+        res = self.fetch_one("SELECT id FROM users WHERE username = %s", (username,))
         return res is not None
 
-    def add_user(self, username, password, role="user"):
+    def create_user(self, username, password, role="user"):
+        """
+        Создает пользователя одним INSERT; занятый логин определяется по ограничению UNIQUE.
+        Возвращает True (создан), False (логин занят) или None (ошибка БД).
+        """
         p_hash = self.hash_password(password)
-        return self.execute_query(
-            "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
-            (username, p_hash, role)
-        )
+        try:
+            with self._get_pool().connection() as conn:
+                with conn.cursor() as cursor:
+                    try:
+                        cursor.execute("INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
+                                       (username, p_hash, role))
+                    except self.storage.IntegrityError:
+                        return False
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Ошибка SQL запроса: {e}")
+            return None
+
+    def add_user(self, username, password, role="user"):
+        return bool(self.create_user(username, password, role))
+
+    def get_user_credentials(self, username):
+        return self.fetch_one("SELECT id, username, password_hash, role FROM users WHERE username = %s", (username,))
+
+    def update_password_hash(self, user_id, password_hash):
+        return self.execute_write("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
 
     def get_all_users(self):
-        return self.execute_query("SELECT id, username, role, created_at FROM users", fetchall=True)
+        return self.fetch_all("SELECT id, username, role, created_at FROM users")
 
     def delete_user(self, user_id):
-        return self.execute_query("DELETE FROM users WHERE id=%s", (user_id,))
+        return self.execute_write("DELETE FROM users WHERE id=%s", (user_id,))
 
 
-    def get_all_employees(self):
-        rows = self.execute_query("SELECT * FROM employees ORDER BY id", fetchall=True)
-        if not rows: return []
-        
-        result = []
+    def _decrypt_rows(self, rows):
+        """Пакетная расшифровка строк из БД через decrypt_many"""
+        encrypted = []
         for r in rows:
-            result.append((
-                r['id'],
-                self.decrypt_data(r['fio']),
-                self.decrypt_data(r['phone']),
-                self.decrypt_data(r['department']),
-                self.decrypt_data(r['position']),
-                r['campus'],
-                r['room']
-            ))
-        return result
+            encrypted.extend((r['fio'], r['phone'], r['department'], r['position']))
+        plain = self.decrypt_many(encrypted)
+        return [
+            (r['id'], *plain[i * 4:i * 4 + 4], r['campus'], r['room'])
+            for i, r in enumerate(rows)
+        ]
+
+    def _fetch_employees_signature(self):
+        row = self.read_query("SELECT COUNT(*) AS cnt, MAX(id) AS max_id, SUM(row_version) AS versions "
+                              "FROM employees", fetchone=True)
+        if not row:
+            return None
+        return (int(row['cnt']), row['max_id'], int(row['versions'] or 0))
+
+    def add_change_listener(self, callback):
+        """
+        Подписка на изменения сотрудников через этот менеджер: callback(event, payload),
+        где event - "upsert" (список новых строк), "remove" (список id) или "reset"
+        (массовое изменение, производные данные нужно пересчитать).
+        Вызывается в потоке, выполнившем запись.
+        """
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback):
+        if callback in self._change_listeners:
+            self._change_listeners.remove(callback)
+
+    def _notify_change(self, event, payload=None):
+        for callback in list(self._change_listeners):
+            try:
+                callback(event, payload)
+            except Exception as e:
+                print(f"Ошибка обработчика изменений: {e}")
+
+    def invalidate_employee_cache(self):
+        self._employee_cache.invalidate()
+
+    def get_all_employees(self, force=False):
+        """
+        Возвращает расшифрованный список сотрудников из кэша процесса.
+        Полная выборка выполняется только если изменилась сигнатура таблицы.
+        """
+        cache = self._employee_cache
+        if not force and cache.is_fresh():
+            return cache.get_rows()
+
+        signature = self._fetch_employees_signature()
+        with cache.lock:
+            if not force and cache.loaded and signature is not None and signature == cache.signature:
+                cache.touch()
+                return cache.get_rows()
+
+        try:
+            result = []
+            for batch in self.iter_employee_batches(EMPLOYEE_BATCH_SIZE):
+                result.extend(self._decrypt_rows(batch))
+        except Exception as e:
+            print(f"Ошибка загрузки сотрудников: {e}")
+            return cache.get_rows() if cache.loaded else []
+
+        cache.load(result, signature)
+        return cache.get_rows()
+
+    def iter_employee_batches(self, batch_size=EMPLOYEE_BATCH_SIZE, after_id=0):
+        """
+        Потоково читает зашифрованные строки с id > after_id пачками по batch_size
+        через небуферизованный курсор: в памяти одновременно находится только одна пачка.
+        """
+        if self.replica is not None:
+            yield from self.replica.iter_employee_batches(batch_size, after_id)
+            return
+        pool = self._get_pool()
+        entry = pool.acquire()
+        finished = False
+        try:
+            cursor = entry.raw.cursor(self.storage.stream_cursorclass)
+            cursor.execute("SELECT * FROM employees WHERE id > %s ORDER BY id", (after_id,))
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                yield batch
+            cursor.close()
+            finished = True
+        finally:
+            # Недочитанный результат не выкачиваем: соединение просто закрывается
+            pool.release(entry, discard=not finished)
+
+    def iter_employees(self, batch_size=EMPLOYEE_BATCH_SIZE, after_id=0):
+        """
+        Генератор сотрудников в порядке id. Поля расшифровываются только при обращении к ним,
+        поэтому потребители, которым нужны отдельные колонки, не платят за остальные.
+        """
+        for batch in self.iter_employee_batches(batch_size, after_id):
+            for raw in batch:
+                yield LazyEmployee(raw, self.decrypt_data)
+
+    @staticmethod
+    def filter_employees(employees, text, field="all"):
+        """Подстрочный поиск без учета регистра по уже расшифрованным строкам"""
+        needle = text.lower()
+        columns = SEARCH_FIELDS.get(field, SEARCH_FIELDS["all"])
+        return [e for e in employees if any(needle in str(e[c]).lower() for c in columns)]
+
+    def search_employees(self, text, field="all"):
+        """
+        Поиск сотрудников. Если расшифрованный кэш уже загружен (или подключена реплика),
+        фильтрация идет по нему локально. На холодном кэше при включенном слепом индексе
+        кандидаты выбираются на сервере, локально проверяются только они.
+        """
+        text = (text or "").strip()
+        if not text:
+            return self.get_all_employees()
+        if USE_BLIND_INDEX and self.blind_index and self.replica is None and not self._employee_cache.loaded:
+            # Строки, измененные без обновления индекса (старые версии программы), переиндексируются
+            self.rebuild_blind_index()
+            candidates = self._search_blind_index(text, field)
+            if candidates is not None:
+                return self.filter_employees(candidates, text, field)
+        return self.filter_employees(self.get_all_employees(), text, field)
+
+    def _search_blind_index(self, text, field):
+        fields = BlindIndex.FIELDS if field == "all" else (field,)
+        subqueries = []
+        params = []
+        for f in fields:
+            tokens = self.blind_index.query_tokens(f, text)
+            if tokens is None:
+                return None
+            if not tokens:
+                continue
+            placeholders = ", ".join(["%s"] * len(tokens))
+            subqueries.append(
+                f"SELECT employee_id FROM employee_bidx WHERE field = %s AND token IN ({placeholders}) "
+                f"GROUP BY employee_id HAVING COUNT(DISTINCT token) = %s"
+            )
+            params.extend([f, *sorted(tokens), len(tokens)])
+        if not subqueries:
+            return []
+
+        query = f"SELECT * FROM employees WHERE id IN ({' UNION '.join(subqueries)}) ORDER BY id"
+        rows = self.fetch_all(query, tuple(params))
+        if rows is None:
+            return None
+        return self._decrypt_rows(rows)
+
+    def _write_blind_index(self, emp_id, fio, phone, department):
+        if not self.blind_index:
+            return True
+        with self._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    self._write_blind_index_rows(cursor, [(emp_id, (fio, phone, department))], WRITE_CHUNK_SIZE)
+                conn.commit()
+                return True
+            except Exception as e:
+                conn.rollback()
+                print(f"Ошибка записи слепого индекса: {e}")
+                return False
+
+    def _delete_blind_index(self, emp_ids):
+        if not self.blind_index or not emp_ids:
+            return
+        with self._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    self._delete_blind_index_rows(cursor, list(emp_ids))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Ошибка удаления слепого индекса: {e}")
+
+    def rebuild_blind_index(self, stale_only=True, known=None):
+        """
+        Строит слепой индекс для записей без индекса или с индексом старой версии строки
+        (row_version в employee_bidx_state), одной транзакцией.
+        known - {(fio, phone, department) как в БД: открытые значения} для только что
+        вставленных строк, чтобы не расшифровывать их заново.
+        """
+        if not self.blind_index:
+            return 0
+        with self._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    count = self._write_stale_blind_index(cursor, stale_only, known)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Ошибка построения слепого индекса: {e}")
+                return 0
+        if count:
+            print(f"Слепой индекс построен для {count} записей")
+        return count
+
+    def _write_stale_blind_index(self, cursor, stale_only=True, known=None, chunk_size=WRITE_CHUNK_SIZE):
+        """
+        Пишет слепой индекс устаревших строк внутри транзакции курсора.
+        executemany не возвращает id вставленных строк, поэтому они находятся по записанным
+        значениям: строки из known берутся как есть, остальные расшифровываются.
+        """
+        query = "SELECT e.id, e.fio, e.phone, e.department FROM employees e"
+        if stale_only:
+            query += (" LEFT JOIN employee_bidx_state s ON s.employee_id = e.id"
+                      " WHERE s.employee_id IS NULL OR s.row_version <> e.row_version")
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        known = known or {}
+        stored = [(r['fio'], r['phone'], r['department']) for r in rows]
+        decrypted = iter(self.decrypt_many(v for key in stored if key not in known for v in key))
+        index_rows = [(r['id'], known.get(key) or (next(decrypted), next(decrypted), next(decrypted)))
+                      for r, key in zip(rows, stored)]
+        self._write_blind_index_rows(cursor, index_rows, chunk_size)
+        return len(index_rows)
+
+    def _write_tombstones(self, emp_ids):
+        """Отметки об удалении, по которым реплики узнают об удаленных строках"""
+        values = ", ".join([f"(%s, {self.storage.now})"] * len(emp_ids))
+        return self.execute_write(f"REPLACE INTO employee_tombstones (employee_id, deleted_at) VALUES {values}",
+                                  tuple(emp_ids))
 
     def add_employee(self, fio, phone, department, position, campus, room):
-        return self.execute_query(
-            "INSERT INTO employees (fio, phone, department, position, campus, room) VALUES (%s, %s, %s, %s, %s, %s)",
-            (self.encrypt_data(fio), self.encrypt_data(phone), self.encrypt_data(department), 
-             self.encrypt_data(position), campus, room)
-        )
+        if self.replica is not None:
+            new_id = self.replica.add_employee(fio, phone, department, position, campus, room)
+        else:
+            new_id = self.execute_write(
+                "INSERT INTO employees (fio, phone, department, position, campus, room) VALUES (%s, %s, %s, %s, %s, %s)",
+                (self.encrypt_data(fio), self.encrypt_data(phone), self.encrypt_data(department), 
+                 self.encrypt_data(position), campus, room),
+                lastrowid=True
+            )
+            if new_id:
+                self._write_blind_index(new_id, fio, phone, department)
+        if new_id:
+            row = (new_id, fio, phone, department, position, campus, room)
+            self._employee_cache.upsert(row)
+            self._notify_change("upsert", [row])
+        return new_id
+
+    def _insert_employee_batch(self, query, params):
+        """Вставляет пачку строк одним executemany в отдельной транзакции"""
+        with self._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    cursor.executemany(query, params)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def add_employees_bulk(self, rows, batch_size=IMPORT_BATCH_SIZE):
+        """
+        Массовое добавление сотрудников. rows - уже проверенные кортежи
+        (fio, phone, department, position, campus, room). Поля шифруются параллельно,
+        вставка идет пачками по batch_size строк, каждая пачка - одна транзакция.
+        Если пачка отклонена сервером, ее строки повторяются по одной, чтобы найти виновные.
+        Возвращает (число добавленных строк, список (индекс строки, текст ошибки)).
+        """
+        rows = list(rows)
+        if not rows:
+            return 0, []
+
+        encrypted = self.encrypt_many(v for r in rows for v in r[:4])
+        params = [tuple(encrypted[i * 4:i * 4 + 4]) + tuple(r[4:6]) for i, r in enumerate(rows)]
+        query = "INSERT INTO employees (fio, phone, department, position, campus, room) VALUES (%s, %s, %s, %s, %s, %s)"
+
+        inserted = 0
+        errors = []
+        for start in range(0, len(params), batch_size):
+            batch = params[start:start + batch_size]
+            try:
+                self._insert_employee_batch(query, batch)
+                inserted += len(batch)
+                continue
+            except Exception as e:
+                print(f"Ошибка пакетной вставки (строки {start + 1}-{start + len(batch)}): {e}")
+            for offset, row_params in enumerate(batch):
+                try:
+                    self._insert_employee_batch(query, [row_params])
+                    inserted += 1
+                except Exception as e:
+                    errors.append((start + offset, str(e)))
+
+        if inserted:
+            self.rebuild_blind_index(known={p[:3]: r[:3] for p, r in zip(params, rows)})
+            if self.replica is not None:
+                self.replica.sync()
+            self.invalidate_employee_cache()
+            self._notify_change("reset")
+        return inserted, errors
 
     def update_employee(self, emp_id, fio, phone, department, position, campus, room):
-        return self.execute_query(
-            "UPDATE employees SET fio=%s, phone=%s, department=%s, position=%s, campus=%s, room=%s WHERE id=%s",
-            (self.encrypt_data(fio), self.encrypt_data(phone), self.encrypt_data(department), 
-             self.encrypt_data(position), campus, room, emp_id)
-        )
+        if self.replica is not None:
+            ok = self.replica.update_employee(emp_id, fio, phone, department, position, campus, room)
+        else:
+            ok = self.execute_write(
+                "UPDATE employees SET fio=%s, phone=%s, department=%s, position=%s, campus=%s, room=%s, "
+                f"row_version = row_version + 1, updated_at = {self.storage.now} WHERE id=%s",
+                (self.encrypt_data(fio), self.encrypt_data(phone), self.encrypt_data(department), 
+                 self.encrypt_data(position), campus, room, emp_id)
+            )
+            if ok:
+                self._write_blind_index(emp_id, fio, phone, department)
+        if ok:
+            row = (int(emp_id), fio, phone, department, position, campus, room)
+            self._employee_cache.upsert(row)
+            self._notify_change("upsert", [row])
+        return ok
 
     def delete_employee(self, emp_id):
-        return self.execute_query("DELETE FROM employees WHERE id=%s", (emp_id,))
+        if self.replica is not None:
+            ok = self.replica.delete_employees([int(emp_id)])
+        else:
+            ok = self.execute_write("DELETE FROM employees WHERE id=%s", (emp_id,))
+            if ok:
+                self._write_tombstones([emp_id])
+                self._delete_blind_index([emp_id])
+        if ok:
+            self._employee_cache.remove([int(emp_id)])
+            self._notify_change("remove", [int(emp_id)])
+        return ok
 
     def delete_employees_bulk(self, emp_ids: list):
         """
         Удаляет несколько сотрудников, используя список ID.
+        Удаление идет пачками по WRITE_CHUNK_SIZE id в одной транзакции.
         """
         if not emp_ids:
             return True
-        placeholders = ', '.join(['%s'] * len(emp_ids))
-        
-        query = f"DELETE FROM employees WHERE id IN ({placeholders})"
-        
-        return self.execute_query(query, tuple(emp_ids))
\ No newline at end of file
+        try:
+            with self.batch() as batch:
+                for emp_id in emp_ids:
+                    batch.delete(emp_id)
+        except Exception as e:
+            print(f"Ошибка удаления сотрудников: {e}")
+            return False
+        return True
+
+    @contextmanager
+    def batch(self, chunk_size=WRITE_CHUNK_SIZE):
+        """
+        Группа изменений, применяемая атомарно при выходе из блока:
+
+            with db.batch() as batch:
+                batch.add(...); batch.update(emp_id, ...); batch.delete(emp_id)
+
+        Если блок завершился исключением, ничего не записывается.
+        """
+        batch = WriteBatch()
+        yield batch
+        self.apply_batch(batch, chunk_size)
+
+    def apply_batch(self, batch, chunk_size=WRITE_CHUNK_SIZE):
+        """
+        Записывает WriteBatch: вставки и изменения - executemany, удаления - IN по chunk_size id,
+        все в одной транзакции. При ошибке транзакция откатывается и исключение пробрасывается.
+        С локальной репликой изменения ставятся в ее очередь одной локальной транзакцией.
+        """
+        if not batch:
+            return
+        updates = list(batch.updates.items())
+        plain = [*batch.inserts, *(row for _, row in updates)]
+        encrypted = self.encrypt_many(v for row in plain for v in row[:4])
+        values = [tuple(encrypted[i * 4:i * 4 + 4]) + tuple(row[4:6]) for i, row in enumerate(plain)]
+        inserts = values[:len(batch.inserts)]
+        updates_enc = [(emp_id, *row) for (emp_id, _), row in zip(updates, values[len(batch.inserts):])]
+
+        if self.replica is not None:
+            written = self.replica.apply_batch(inserts, updates_enc, batch.deletes)
+        else:
+            written = self._write_batch(inserts, updates_enc, batch.inserts, updates, batch.deletes, chunk_size)
+
+        # id новых строк executemany не возвращает, а изменения несуществующих id ничего не пишут -
+        # в этих случаях кэш не правится точечно, а перечитывается
+        if batch.inserts or written is None or len(written) < len(updates):
+            self.invalidate_employee_cache()
+            self._notify_change("reset")
+            return
+        if updates:
+            rows = [(emp_id, *row) for emp_id, row in updates]
+            for row in rows:
+                self._employee_cache.upsert(row)
+            self._notify_change("upsert", rows)
+        if batch.deletes:
+            self._employee_cache.remove(batch.deletes)
+            self._notify_change("remove", list(batch.deletes))
+
+    def _write_batch(self, inserts, updates, plain_inserts, plain_updates, deletes, chunk_size):
+        """Пишет пачку одной транзакцией. Возвращает id измененных строк или None, если их не удалось определить."""
+        now = self.storage.now
+        updated = set()
+        deleted = set(deletes)
+        exact = True
+        with self._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    for chunk in _chunked(inserts, chunk_size):
+                        cursor.executemany(
+                            "INSERT INTO employees (fio, phone, department, position, campus, room) "
+                            "VALUES (%s, %s, %s, %s, %s, %s)", chunk)
+                    for chunk in _chunked(updates, chunk_size):
+                        ids = [emp_id for emp_id, *_ in chunk]
+                        cursor.execute(f"SELECT id FROM employees WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+                        existing = {r['id'] for r in cursor.fetchall()}
+                        chunk = [row for row in chunk if row[0] in existing]
+                        if not chunk:
+                            continue
+                        cursor.executemany(
+                            "UPDATE employees SET fio=%s, phone=%s, department=%s, position=%s, campus=%s, room=%s, "
+                            f"row_version = row_version + 1, updated_at = {now} WHERE id=%s",
+                            [(*row, emp_id) for emp_id, *row in chunk])
+                        updated.update(existing)
+                        # Строку могли удалить между SELECT и UPDATE - тогда точный набор неизвестен
+                        exact = exact and cursor.rowcount == len(chunk)
+                    for chunk in _chunked(deletes, chunk_size):
+                        placeholders = ", ".join(["%s"] * len(chunk))
+                        cursor.execute(f"DELETE FROM employees WHERE id IN ({placeholders})", chunk)
+                        cursor.execute("REPLACE INTO employee_tombstones (employee_id, deleted_at) VALUES "
+                                       + ", ".join([f"(%s, {now})"] * len(chunk)), chunk)
+                        if self.blind_index:
+                            self._delete_blind_index_rows(cursor, chunk)
+                    if self.blind_index:
+                        self._write_blind_index_rows(
+                            cursor, [row for row in plain_updates if row[0] in updated and row[0] not in deleted],
+                            chunk_size)
+                        if inserts:
+                            self._write_stale_blind_index(
+                                cursor, known={enc[:3]: row[:3] for enc, row in zip(inserts, plain_inserts)},
+                                chunk_size=chunk_size)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return updated if exact else None
+
+    def _write_blind_index_rows(self, cursor, rows, chunk_size):
+        """
+        Перестраивает слепой индекс строк [(id, (fio, phone, department, ...))] внутри транзакции
+        и запоминает row_version, с которой он построен.
+        """
+        for chunk in _chunked(rows, chunk_size):
+            ids = [emp_id for emp_id, _ in chunk]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"DELETE FROM employee_bidx WHERE employee_id IN ({placeholders})", ids)
+            tokens = [(emp_id, f, token) for emp_id, row in chunk
+                      for f, token in self.blind_index.employee_tokens(*row[:3])]
+            if tokens:
+                cursor.executemany("INSERT INTO employee_bidx (employee_id, field, token) VALUES (%s, %s, %s)", tokens)
+            cursor.execute("REPLACE INTO employee_bidx_state (employee_id, row_version) "
+                           f"SELECT id, row_version FROM employees WHERE id IN ({placeholders})", ids)
+
+    @staticmethod
+    def _delete_blind_index_rows(cursor, emp_ids):
+        placeholders = ", ".join(["%s"] * len(emp_ids))
+        cursor.execute(f"DELETE FROM employee_bidx WHERE employee_id IN ({placeholders})", emp_ids)
+        cursor.execute(f"DELETE FROM employee_bidx_state WHERE employee_id IN ({placeholders})", emp_ids)
+
+    def rename_department(self, old_name, new_name):
+        """
+        Переименовывает отдел у всех сотрудников одной транзакцией. Колонка зашифрована,
+        поэтому строки выбираются по расшифрованному кэшу. Возвращает число измененных строк.
+        """
+        rows = [r for r in self.get_all_employees(force=True) if r[3] == old_name]
+        if rows:
+            with self.batch() as batch:
+                for r in rows:
+                    batch.update(r[0], r[1], r[2], new_name, r[4], r[5], r[6])
+        return len(rows)
+
+    def move_campus(self, old_campus, new_campus):
+        """Переносит всех сотрудников корпуса одним UPDATE (campus не шифруется). Возвращает число строк."""
+        if self.replica is not None:
+            # Изменения реплики идут через очередь построчно, чтобы сработала проверка версий
+            rows = [r for r in self.get_all_employees(force=True) if r[5] == old_campus]
+            if rows:
+                with self.batch() as batch:
+                    for r in rows:
+                        batch.update(r[0], r[1], r[2], r[3], r[4], new_campus, r[6])
+            return len(rows)
+
+        with self._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT id FROM employees WHERE campus = %s", (old_campus,))
+                    ids = {r['id'] for r in cursor.fetchall()}
+                    if ids:
+                        cursor.execute("UPDATE employees SET campus = %s, row_version = row_version + 1, "
+                                       f"updated_at = {self.storage.now} WHERE campus = %s", (new_campus, old_campus))
+                        if self.blind_index:
+                            # Корпус в индекс не входит: токены остаются верными, сдвигается только версия
+                            for chunk in _chunked(sorted(ids), WRITE_CHUNK_SIZE):
+                                cursor.execute("UPDATE employee_bidx_state SET row_version = row_version + 1 "
+                                               f"WHERE employee_id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if ids:
+            cache = self._employee_cache
+            rows = [(*r[:5], new_campus, r[6]) for r in cache.get_rows() if r[0] in ids] if cache.loaded else []
+            if len(rows) == len(ids):
+                for row in rows:
+                    cache.upsert(row)
+                self._notify_change("upsert", rows)
+            else:
+                self.invalidate_employee_cache()
+                self._notify_change("reset")
+        return len(ids)
@@ -1,27 +1,93 @@
 import os
+import csv
+import json
+import traceback
+from abc import ABC, abstractmethod
 from datetime import datetime
-import openpyxl
-from openpyxl.styles import Font, Border, Side, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
+from itertools import chain, islice
+import importlib.util
+
+# openpyxl и pyarrow импортируются внутри методов: модуль подключается при старте GUI,
+# а тяжелые библиотеки нужны только в момент экспорта
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+from config import EXCEL_STREAMING, EXCEL_WIDTH_SAMPLE, EXPORT_CHUNK_SIZE
+
+TITLE = "ВЕДОМОСТЬ СОТРУДНИКОВ УНИВЕРСИТЕТА"
+HEADERS = ["ID", "ФИО", "Телефон", "Отдел", "Должность", "Корпус", "Кабинет"]
+FIELDS = ("id", "fio", "phone", "department", "position", "campus", "room")
+CENTER_COLUMNS = (0, 5, 6)
+
+
+class BaseExporter(ABC):
+    """
+    Общий интерфейс экспорта. Подкласс реализует _write(employees, out_path)
+    и возвращает число записанных строк; 0 означает, что данных не было.
+    """
+    extension = ""
+    description = ""
+    available = True
 
-class DataExporter:
     def __init__(self, db_manager):
         self.db = db_manager
 
+    def export(self, employees, out_path=None, **options):
+        """
+        employees - любой итерируемый набор строк (список, результат поиска, генератор);
+        если передан None, справочник читается из БД потоком.
+        """
+        try:
+            if employees is None:
+                employees = self.db.iter_employees()
+
+            if not out_path:
+                out_path = f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}{self.extension}"
+
+            count = self._write(employees, out_path, **options)
+            if not count:
+                return False, "Нет данных для экспорта"
+            return True, f"Экспортировано записей: {count}. Файл: {os.path.abspath(out_path)}"
+
+        except Exception as e:
+            traceback.print_exc()
+            return False, f"Ошибка экспорта: {e}"
+
+    @abstractmethod
+    def _write(self, employees, out_path, **options):
+        """Записывает строки в out_path и возвращает их число"""
+
+    @staticmethod
+    def _chunks(employees, size=EXPORT_CHUNK_SIZE):
+        """Режет поток строк на пачки кортежей, чтобы писать файл крупными блоками"""
+        rows = iter(employees)
+        while True:
+            chunk = [tuple(emp) for emp in islice(rows, size)]
+            if not chunk:
+                return
+            yield chunk
+
+
+class DataExporter(BaseExporter):
+    extension = ".xlsx"
+    description = "Excel"
+
     def _create_default_template(self, filename="template.xlsx"):
         """
         Создает базовый шаблон с заголовком и шапкой, если он отсутствует.
         """
+        import openpyxl
+        from openpyxl.styles import Font, Border, Side, PatternFill, Alignment
+
         wb = openpyxl.Workbook()
         ws = wb.active
         ws.title = "Сотрудники"
-        
 
-        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), 
+
+        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
                              top=Side(style='thin'), bottom=Side(style='thin'))
 
 
-        ws['A1'] = "ВЕДОМОСТЬ СОТРУДНИКОВ УНИВЕРСИТЕТА"
+        ws['A1'] = TITLE
         ws['A1'].font = Font(size=14, bold=True)
         ws.merge_cells('A1:G1')
         ws['A1'].alignment = Alignment(horizontal='center', vertical='center')
@@ -30,116 +96,267 @@ class DataExporter:
         ws['A2'] = f"Дата создания отчета: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
         ws['A2'].font = Font(size=10, italic=True, color='808080')
         ws.merge_cells('A2:G2')
-        
 
-        headers = ["ID", "ФИО", "Телефон", "Отдел", "Должность", "Корпус", "Кабинет"]
+
         header_fill = PatternFill(start_color="3B8ED0", end_color="3B8ED0", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF")
-        
-        for col_num, header in enumerate(headers, 1):
+
+        for col_num, header in enumerate(HEADERS, 1):
             cell = ws.cell(row=3, column=col_num)
             cell.value = header
             cell.font = header_font
             cell.fill = header_fill
             cell.border = thin_border
             cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            
+
         wb.save(filename)
 
-    def export_to_excel(self, employees, out_path):
+    @staticmethod
+    def _prepare_row(emp):
+        """Приводит ID, корпус и кабинет к числам, чтобы Excel корректно их сортировал"""
+        processed_emp = list(emp)
+
+        try: processed_emp[0] = int(emp[0])
+        except: pass
+
+        # Короткие строки (без корпуса/кабинета) пишутся как есть
+        # isdigit() отсекает "+5", " 3" и "1_0", которые int() принял бы; try - для "²" и подобных цифр
+        for i in range(5, min(len(emp), 7)):
+            if str(emp[i]).isdigit():
+                try: processed_emp[i] = int(emp[i])
+                except ValueError: pass
+        return processed_emp
+
+    @staticmethod
+    def _column_width(col_index, length):
+        if col_index in (0, 5, 6):
+            return min(length + 2, 12)
+        if col_index in (1, 3):
+            return min(length + 2, 40)
+        return length + 2
+
+    def export_to_excel(self, employees, out_path, streaming=None):
         """
-        Экспорт в Excel с использованием шаблона и корректными типами данных.
+        Экспорт в Excel. По умолчанию используется потоковая запись (write-only книга),
+        иначе - заполнение шаблона template.xlsx.
         """
-        if not employees:
-            return False,
-        try:
-            employees = self.db.get_all_employees()
-            if not employees:
-                return False,
+        return self.export(employees, out_path, streaming=streaming)
 
-            ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-            if not out_path:
-                out_path = f"export_{ts}.xlsx"
+    def _write(self, employees, out_path, streaming=None):
+        if streaming is None:
+            streaming = EXCEL_STREAMING
+        if streaming:
+            return self._export_streaming(employees, out_path)
+        return self._export_template(employees, out_path)
 
+    def _register_styles(self, wb):
+        """Общие именованные стили: создаются один раз на книгу, а не на каждую ячейку"""
+        from openpyxl.styles import Font, Border, Side, PatternFill, Alignment, NamedStyle
 
-            template_name = "template.xlsx"
-            if not os.path.exists(template_name):
-                self._create_default_template(template_name)
+        thin = Side(style='thin')
+        thin_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        styles = [
+            NamedStyle(name="report_title", font=Font(size=14, bold=True),
+                       alignment=Alignment(horizontal='center', vertical='center')),
+            NamedStyle(name="report_date", font=Font(size=10, italic=True, color='808080')),
+            NamedStyle(name="report_header", font=Font(bold=True, color="FFFFFF"), border=thin_border,
+                       fill=PatternFill(start_color="3B8ED0", end_color="3B8ED0", fill_type="solid"),
+                       alignment=Alignment(horizontal='center', vertical='center', wrap_text=True)),
+            NamedStyle(name="report_left", border=thin_border, alignment=Alignment(horizontal='left', vertical='top')),
+            NamedStyle(name="report_center", border=thin_border, alignment=Alignment(horizontal='center', vertical='top')),
+        ]
+        for style in styles:
+            wb.add_named_style(style)
 
+    def _export_streaming(self, employees, out_path):
+        """
+        Потоковая запись через write-only книгу: строки сразу уходят во временный файл,
+        поэтому память не растет с размером справочника. Ширины колонок нужно задать
+        до первой строки, поэтому они считаются по первым EXCEL_WIDTH_SAMPLE записям
+        в том же проходе, без повторного чтения данных.
+        """
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
 
-            wb = openpyxl.load_workbook(template_name)
-            ws = wb.active
-            
+        def styled(value, style):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style
+            return cell
 
-            ws['A2'] = f"Дата создания отчета: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
-            
-            start_row = 4 
-            
-            thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                                 top=Side(style='thin'), bottom=Side(style='thin'))
+        wb = openpyxl.Workbook(write_only=True)
+        self._register_styles(wb)
+        ws = wb.create_sheet("Сотрудники")
 
+        rows = iter(employees)
+        head = [self._prepare_row(emp) for emp in islice(rows, EXCEL_WIDTH_SAMPLE)]
+        if not head:
+            return 0
 
-            center_cols = [0, 5, 6] 
+        lengths = [len(h) for h in HEADERS]
+        for row in head:
+            for i, value in enumerate(row[:len(HEADERS)]):
+                if value is not None and len(str(value)) > lengths[i]:
+                    lengths[i] = len(str(value))
+        for i, length in enumerate(lengths):
+            ws.column_dimensions[get_column_letter(i + 1)].width = self._column_width(i, length)
 
-            for i, emp in enumerate(employees):
-                row_num = start_row + i
-                
+        last_col = get_column_letter(len(HEADERS))
+        ws.merged_cells.add(f"A1:{last_col}1")
+        ws.merged_cells.add(f"A2:{last_col}2")
+        ws.append([styled(TITLE, "report_title")])
+        ws.append([styled(f"Дата создания отчета: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}",
+                                "report_date")])
+        ws.append([styled(h, "report_header") for h in HEADERS])
 
-                processed_emp = list(emp)
-                
+        col_styles = ["report_center" if i in CENTER_COLUMNS else "report_left" for i in range(len(HEADERS))]
+        count = 0
+        for row in head:
+            ws.append([styled(v, s) for v, s in zip(row, col_styles)])
+            count += 1
+        for emp in rows:
+            ws.append([styled(v, s) for v, s in zip(self._prepare_row(emp), col_styles)])
+            count += 1
 
-                try: processed_emp[0] = int(emp[0])
-                except: pass
+        wb.save(out_path)
+        return count
 
-                try:
-                    if str(emp[5]).isdigit():
-                        processed_emp[5] = int(emp[5])
-                except:
-                    pass
+    def _export_template(self, employees, out_path):
+        """Заполнение шаблона: вся книга держится в памяти, подходит для небольших выборок"""
+        import openpyxl
+        from openpyxl.styles import Border, Side, Alignment
+        from openpyxl.utils import get_column_letter
+
+        template_name = "template.xlsx"
+        if not os.path.exists(template_name):
+            self._create_default_template(template_name)
+
+
+        wb = openpyxl.load_workbook(template_name)
+        ws = wb.active
+
+
+        ws['A2'] = f"Дата создания отчета: {datetime.now().strftime('%d.%m.%Y %H:%M:%S')}"
+
+        start_row = 4
 
+        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                             top=Side(style='thin'), bottom=Side(style='thin'))
+        align_center = Alignment(horizontal='center', vertical='top')
+        align_left = Alignment(horizontal='left', vertical='top')
+
+        count = 0
+        for i, emp in enumerate(employees):
+            count += 1
+            row_num = start_row + i
+            processed_emp = self._prepare_row(emp)
+
+            for col_index, value in enumerate(processed_emp):
+                col_num = col_index + 1
+                cell = ws.cell(row=row_num, column=col_num)
+
+                cell.value = value
+                cell.border = thin_border
+                cell.alignment = align_center if col_index in CENTER_COLUMNS else align_left
+
+        for i, column_cells in enumerate(ws.columns, 1):
+            length = 0
+            for cell in column_cells:
                 try:
-                    if str(emp[6]).isdigit():
-                        processed_emp[6] = int(emp[6])
+                    if cell.value:
+                        curr_len = len(str(cell.value))
+                        if curr_len > length:
+                            length = curr_len
                 except:
                     pass
 
-                for col_index, value in enumerate(processed_emp):
-                    col_num = col_index + 1 
-                    cell = ws.cell(row=row_num, column=col_num)
-                    
-                    cell.value = value
-                    cell.border = thin_border
-                    
-                    if col_index in center_cols:
-                        cell.alignment = Alignment(horizontal='center', vertical='top')
-                    else:
-                        cell.alignment = Alignment(horizontal='left', vertical='top')
-
-            for i, column_cells in enumerate(ws.columns, 1):
-                length = 0
-                for cell in column_cells:
-                    try:
-                        if cell.value:
-                            curr_len = len(str(cell.value))
-                            if curr_len > length:
-                                length = curr_len
-                    except:
-                        pass
-                
-                col_letter = get_column_letter(i)
-                if i in [1, 6, 7]: 
-                    width = min(length + 2, 12)
-                elif i in [2, 4]: 
-                    width = min(length + 2, 40)
-                else:
-                    width = length + 2
-                
-                ws.column_dimensions[col_letter].width = width
+            col_letter = get_column_letter(i)
+            ws.column_dimensions[col_letter].width = self._column_width(i - 1, length)
 
+        if count:
             wb.save(out_path)
-            return True, f"Данные успешно экспортированы в {os.path.abspath(out_path)}"
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return False, f"Ошибка экспорта: {e}"
\ No newline at end of file
+        return count
+
+
+
+class CsvExporter(BaseExporter):
+    """Сырые данные в CSV (UTF-8, первая строка - имена полей)"""
+    extension = ".csv"
+    description = "CSV"
+
+    def _write(self, employees, out_path):
+        chunks = self._chunks(employees)
+        first = next(chunks, None)
+        if not first:
+            return 0
+        count = 0
+        with open(out_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for chunk in chain((first,), chunks):
+                writer.writerows(chunk)
+                count += len(chunk)
+        return count
+
+
+class JsonLinesExporter(BaseExporter):
+    """Одна запись - один JSON-объект на строке"""
+    extension = ".jsonl"
+    description = "JSON Lines"
+
+    def _write(self, employees, out_path):
+        chunks = self._chunks(employees)
+        first = next(chunks, None)
+        if not first:
+            return 0
+        count = 0
+        with open(out_path, "w", encoding="utf-8") as f:
+            for chunk in chain((first,), chunks):
+                f.write("".join(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) + "\n" for row in chunk))
+                count += len(chunk)
+        return count
+
+
+class ParquetExporter(BaseExporter):
+    """Колоночный формат Parquet; каждая пачка записывается отдельной группой строк. Нужен pyarrow."""
+    extension = ".parquet"
+    description = "Parquet"
+    available = HAS_PYARROW
+
+    def _write(self, employees, out_path):
+        if not HAS_PYARROW:
+            raise RuntimeError("Для экспорта в Parquet установите pyarrow")
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunks = self._chunks(employees)
+        first = next(chunks, None)
+        if not first:
+            return 0
+        schema = pa.schema([("id", pa.int64())] + [(name, pa.string()) for name in FIELDS[1:]])
+        count = 0
+        with pq.ParquetWriter(out_path, schema) as writer:
+            for chunk in chain((first,), chunks):
+                columns = list(zip(*chunk))
+                arrays = [pa.array([int(v) for v in columns[0]], pa.int64())]
+                arrays += [pa.array([None if v is None else str(v) for v in col], pa.string()) for col in columns[1:]]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                count += len(chunk)
+        return count
+
+
+EXPORTERS = (DataExporter, CsvExporter, JsonLinesExporter, ParquetExporter)
+
+
+def available_exporters():
+    """Форматы, доступные в текущем окружении (Parquet - только при установленном pyarrow)"""
+    return [cls for cls in EXPORTERS if cls.available]
+
+
+def exporter_for_path(path, db_manager):
+    """Подбирает экспортер по расширению файла; по умолчанию - Excel"""
+    ext = os.path.splitext(path)[1].lower()
+    for cls in EXPORTERS:
+        if cls.extension == ext:
+            return cls(db_manager)
+    return DataExporter(db_manager)
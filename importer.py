@@ -0,0 +1,108 @@
+import csv
+import os
+
+from exporter import HEADERS, FIELDS
+from validation import validate_employee, EmployeeValidationError
+
+# Имена колонок, по которым узнается поле: английские (CSV/JSON экспорт) и русские (Excel-ведомость)
+COLUMN_ALIASES = {field: {field, header.lower()} for field, header in zip(FIELDS, HEADERS)}
+IMPORT_FIELDS = FIELDS[1:]
+HEADER_SEARCH_ROWS = 10
+
+
+class ImportResult:
+    def __init__(self):
+        self.total = 0
+        self.imported = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+    def summary(self, max_errors=10):
+        lines = [f"Обработано строк: {self.total}", f"Добавлено сотрудников: {self.imported}"]
+        if self.errors:
+            lines.append(f"Ошибок: {len(self.errors)}")
+            for line, message in sorted(self.errors)[:max_errors]:
+                lines.append(f"  строка {line}: {message}".replace("\n", " "))
+            if len(self.errors) > max_errors:
+                lines.append(f"  ... и еще {len(self.errors) - max_errors}")
+        return "\n".join(lines)
+
+
+class EmployeeImporter:
+    """
+    Массовый импорт сотрудников из CSV или XLSX. Строки проверяются теми же правилами,
+    что и форма сотрудника, и добавляются через DatabaseManager.add_employees_bulk.
+    Файлы в формате нашего экспорта (CSV и Excel-ведомость) читаются без доработки.
+    """
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def read_rows(self, path):
+        """Генератор (номер строки в файле, список значений)"""
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                sample = f.read(4096)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+                except csv.Error:
+                    dialect = csv.excel
+                for line, row in enumerate(csv.reader(f, dialect), 1):
+                    yield line, row
+        elif ext == ".xlsx":
+            import openpyxl
+            wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+            try:
+                for line, row in enumerate(wb.active.iter_rows(values_only=True), 1):
+                    yield line, ["" if v is None else str(v) for v in row]
+            finally:
+                wb.close()
+        else:
+            raise ValueError(f"Неподдерживаемый формат файла: {ext}")
+
+    @staticmethod
+    def _match_header(row):
+        """Возвращает {поле: индекс колонки}, если строка похожа на шапку таблицы"""
+        mapping = {}
+        for index, value in enumerate(row):
+            name = str(value).strip().lower()
+            for field, aliases in COLUMN_ALIASES.items():
+                if name in aliases and field not in mapping:
+                    mapping[field] = index
+        if all(field in mapping for field in IMPORT_FIELDS):
+            return mapping
+        return None
+
+    def import_file(self, path):
+        result = ImportResult()
+        rows = self.read_rows(path)
+
+        mapping = None
+        for line, row in rows:
+            mapping = self._match_header(row)
+            if mapping or line >= HEADER_SEARCH_ROWS:
+                break
+        if not mapping:
+            raise ValueError("Не найдена строка заголовков. Нужны колонки: " + ", ".join(HEADERS[1:]))
+
+        valid = []
+        lines = []
+        for line, row in rows:
+            if not any(str(v).strip() for v in row):
+                continue
+            result.total += 1
+            values = [row[mapping[f]] if mapping[f] < len(row) else "" for f in IMPORT_FIELDS]
+            try:
+                valid.append(validate_employee(*values))
+                lines.append(line)
+            except EmployeeValidationError as e:
+                result.add_error(line, str(e))
+
+        inserted, errors = self.db.add_employees_bulk(valid)
+        result.imported = inserted
+        for index, message in errors:
+            result.add_error(lines[index], message)
+        return result
@@ -0,0 +1,83 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+
+
+class DerivedKeyCache:
+    """
+    Кэш ключа, полученного из ENCRYPTION_PASSWORD через PBKDF2, чтобы не повторять
+    100 000 итераций при каждом запуске. На POSIX-системах файл доступен только
+    владельцу (0600); в Windows права не выставляются и ключ лежит в файле открыто,
+    поэтому там кэш по умолчанию выключен (KEY_CACHE_ENABLED).
+
+    Запись привязана к соли и числу итераций (key id), а проверочный HMAC(ключ, пароль)
+    гарантирует, что при смене пароля кэш не будет использован.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def key_id(salt, iterations):
+        return hashlib.sha256(b"pbkdf2-sha256|" + salt + b"|" + str(iterations).encode()).hexdigest()
+
+    @staticmethod
+    def _verifier(key, password):
+        return hmac.new(key, b"unicontacts-key-cache|" + password, hashlib.sha256).hexdigest()
+
+    def _load(self):
+        try:
+            if os.name == "posix" and os.stat(self.path).st_mode & 0o077:
+                # Файл стал доступен другим пользователям - доверять ему нельзя
+                print(f"Кэш ключа {self.path} имеет небезопасные права, он будет пересоздан")
+                self.clear()
+                return {}
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ошибка чтения кэша ключа: {e}")
+            return {}
+
+    def get(self, password, salt, iterations):
+        entry = self._load().get(self.key_id(salt, iterations))
+        if not entry:
+            return None
+        try:
+            key = base64.b64decode(entry["key"])
+        except Exception:
+            return None
+        if not hmac.compare_digest(entry.get("verifier", ""), self._verifier(key, password)):
+            return None
+        return key
+
+    def put(self, password, salt, iterations, key):
+        entries = self._load()
+        entries[self.key_id(salt, iterations)] = {
+            "key": base64.b64encode(key).decode(),
+            "verifier": self._verifier(key, password),
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".keycache")
+            try:
+                if os.name == "posix":
+                    os.fchmod(fd, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            print(f"Ошибка записи кэша ключа: {e}")
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -1,3 +1,4 @@
+from startup import StartupTimer
 import customtkinter as ctk
 from tkinter import ttk, messagebox, Menu, filedialog
 import tkinter as tk
@@ -5,22 +6,43 @@ from tkinter import font as tkfont
 import sys
 import os
 import traceback
-import re
+import threading
 import subprocess
 from datetime import datetime
-from collections import Counter
 import gc
+import multiprocessing
+import importlib.util
 
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    HAS_MATPLOTLIB = True
-except ImportError:
-    HAS_MATPLOTLIB = False
+# matplotlib загружается при первом открытии статистики, а не при старте
+HAS_MATPLOTLIB = importlib.util.find_spec("matplotlib") is not None
+Figure = None
+mpl_style = None
+FigureCanvasTkAgg = None
 
 from database import DatabaseManager
 from auth import AuthManager
-from exporter import DataExporter
+from exporter import DataExporter, available_exporters, exporter_for_path
+from worker import BackgroundWorker
+from importer import EmployeeImporter
+from stats import StatisticsService
+from replica import LocalReplica
+from validation import validate_employee, EmployeeValidationError
+from virtual_tree import VirtualTreeview, ColumnAutosizer
+from config import (DB_WORKER_THREADS, SEARCH_DEBOUNCE_MS, AUTOSIZE_SAMPLE_THRESHOLD,
+                    STARTUP_BUDGET_MS, STARTUP_PROFILE, REPLICA_CONFIG)
+
+startup_timer = StartupTimer(STARTUP_BUDGET_MS, verbose=STARTUP_PROFILE)
+startup_timer.mark("imports")
+
+
+def load_matplotlib():
+    # pyplot не используется: его глобальный реестр фигур удерживает их в памяти до plt.close()
+    global Figure, mpl_style, FigureCanvasTkAgg
+    if Figure is None:
+        from matplotlib import style
+        from matplotlib.figure import Figure as figure_class
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg as canvas_class
+        Figure, mpl_style, FigureCanvasTkAgg = figure_class, style, canvas_class
 
 ctk.set_appearance_mode("Dark")
 
@@ -41,6 +63,15 @@ HOVER_RED = "#4a2a2a"
 HOVER_DARK = "#262626"
 HOVER_LOGOUT = "#4a2a3a"
 
+TREE_ROW_HEIGHT = 45
+# Как часто поток Tk проверяет изменения справочника, пришедшие из фоновой синхронизации
+CHANGE_POLL_MS = 500
+# Как часто обновляется состояние очереди локальной реплики в боковой панели
+SYNC_STATUS_MS = 3000
+SYNC_OPS = {"insert": "добавление", "update": "изменение", "delete": "удаление"}
+
+SEARCH_FILTERS = {"Все": "all", "Телефон": "phone", "ФИО": "fio", "Отдел": "department"}
+
 
 class ToolTip(object):
     def __init__(self, widget):
@@ -266,12 +297,33 @@ class AuthDialog(ctk.CTkToplevel):
         self.password_entry.delete(0, 'end')
         self.confirm_password_entry.delete(0, 'end')
 
+    def run_when_db_ready(self, action):
+        """Выполняет action, когда фоновое подключение к БД завершится"""
+        label = self.action_button.cget("text")
+        self.action_button.configure(state="disabled", text="Подключение к БД...")
+
+        def on_ready(ok):
+            if not self.winfo_exists():
+                return
+            self.action_button.configure(state="normal", text=label)
+            if ok:
+                action()
+            else:
+                show_custom_message(self, "Ошибка", "Не удалось подключиться к базе данных!", "error")
+
+        self.parent.when_db_ready(on_ready)
+
     def login(self):
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
         if not username or not password:
             show_custom_message(self, "Ошибка", "Введите логин и пароль!", "error")
             return
+        if self.action_button.cget("state") == "disabled":
+            return
+        self.run_when_db_ready(lambda: self._authenticate(username, password))
+
+    def _authenticate(self, username, password):
         try:
             user_data = self.auth_manager.authenticate(username, password)
             if user_data:
@@ -298,6 +350,11 @@ class AuthDialog(ctk.CTkToplevel):
         if password != confirm_password:
             show_custom_message(self, "Ошибка", "Пароли не совпадают!", "error")
             return
+        if self.action_button.cget("state") == "disabled":
+            return
+        self.run_when_db_ready(lambda: self._register(username, password))
+
+    def _register(self, username, password):
         try:
             success, message = self.auth_manager.register_user(username, password)
             if success:
@@ -313,8 +370,10 @@ class AuthDialog(ctk.CTkToplevel):
             show_custom_message(self, "Ошибка", f"Ошибка регистрации: {str(e)}", "error")
 
     def guest_login(self):
-        self.user_data = {'id': 0, 'username': 'guest', 'role': 'guest'}
-        self.destroy()
+        def enter():
+            self.user_data = {'id': 0, 'username': 'guest', 'role': 'guest'}
+            self.destroy()
+        self.run_when_db_ready(enter)
 
 
 class UltimatePhoneBook(ctk.CTk):
@@ -335,14 +394,24 @@ class UltimatePhoneBook(ctk.CTk):
         self.header_font = tkfont.Font(family="Segoe UI", size=12, weight="bold")
 
         self.db_manager = DatabaseManager()
-        if not self.db_manager.init_database():
-            messagebox.showerror("Ошибка", "Не удалось инициализировать базу данных!")
-            self.destroy()
-            return
+        self.stats = StatisticsService(self.db_manager)
+        self.worker = BackgroundWorker(self, max_workers=DB_WORKER_THREADS, on_busy_change=self.on_busy_change)
+        # Подключение и проверка схемы идут в фоне, пока пользователь видит окно входа
+        self._db_ready = None
+        self._db_waiters = []
+        # Сброс справочника (синхронизация реплики, смена временных id) приходит из фоновых
+        # потоков, поэтому здесь только ставится флаг, а перечитывание идет в потоке Tk
+        self._employees_reset = threading.Event()
+        self.db_manager.add_change_listener(self.on_employees_changed)
+        self.start_database_init()
+        startup_timer.mark("window")
 
         self.auth_manager = AuthManager(self.db_manager)
         try:
             auth_dialog = AuthDialog(self, self.auth_manager)
+            auth_dialog.update_idletasks()
+            startup_timer.mark("login")
+            startup_timer.report()
             self.wait_window(auth_dialog)
             if not auth_dialog.user_data:
                 self.destroy()
@@ -351,7 +420,7 @@ class UltimatePhoneBook(ctk.CTk):
             self.current_user = auth_dialog.user_data
             self.exporter = DataExporter(self.db_manager)
 
-            if not self.db_manager.connect():
+            if not self.db_manager.connect() and self.db_manager.replica is None:
                 messagebox.showerror("Ошибка", "Не удалось подключиться к БД!")
                 self.destroy()
                 return
@@ -370,6 +439,15 @@ class UltimatePhoneBook(ctk.CTk):
             self.employee_frame = None
             self.users_frame = None
 
+            self._search_after_id = None
+            self._search_query = None
+            self._last_search = None
+
+            self.autosizer = ColumnAutosizer([s["text"] for s in self.column_settings.values()],
+                                             self.table_font, self.header_font,
+                                             sample_threshold=AUTOSIZE_SAMPLE_THRESHOLD)
+            self._applied_widths = {}
+
             self.create_sidebar()
             self.create_main_container()
             self.show_employee_list() 
@@ -381,8 +459,11 @@ class UltimatePhoneBook(ctk.CTk):
             self.tree.bind("<Leave>", lambda e: self.tooltip.hidetip())
             self.bind("<Button-1>", self.on_window_click)
             self.main_container.bind("<Button-1>", self.on_empty_area_click)
+            self._employees_reset.clear()
             self.refresh_data()
             self.update_clock()
+            self.poll_employee_changes()
+            self.update_sync_status()
             
         except Exception as e:
             if "application has been destroyed" not in str(e):
@@ -390,6 +471,39 @@ class UltimatePhoneBook(ctk.CTk):
                 print(f"Ошибка запуска: {traceback.format_exc()}")
             self.destroy()
 
+    def start_database_init(self):
+        self._db_ready = None
+
+        def prepare():
+            # Реплика открывается до обращения к серверу: справочник читается с диска и без связи
+            if REPLICA_CONFIG['enabled'] and self.db_manager.replica is None:
+                replica = LocalReplica(self.db_manager)
+                self.db_manager.attach_replica(replica)
+                replica.start()
+            ok = self.db_manager.connect() and self.db_manager.init_database()
+            if ok and self.db_manager.replica is not None:
+                self.db_manager.replica.sync()
+            return ok or self.db_manager.replica is not None
+
+        self.worker.submit(prepare, key="startup", on_success=self._on_database_ready,
+                           on_error=lambda e: self._on_database_ready(False))
+
+    def _on_database_ready(self, ok):
+        self._db_ready = bool(ok)
+        startup_timer.mark("database")
+        waiters, self._db_waiters = self._db_waiters, []
+        for callback in waiters:
+            callback(self._db_ready)
+
+    def when_db_ready(self, callback):
+        """Вызывает callback(ok) после подключения к БД; при прошлой неудаче повторяет попытку"""
+        if self._db_ready:
+            callback(True)
+            return
+        self._db_waiters.append(callback)
+        if self._db_ready is False:
+            self.start_database_init()
+
     def on_window_click(self, event):
         """Обработчик клика по окну для снятия фокуса"""
         if not self._is_closing:
@@ -412,7 +526,7 @@ class UltimatePhoneBook(ctk.CTk):
                     self.focus_set()
                 
                 if hasattr(self, 'tree') and widget != self.tree and not self.is_child_of(widget, self.tree):
-                    self.tree.selection_remove(self.tree.selection())
+                    self.tree.clear_selection()
                     
             except Exception:
                 pass
@@ -428,6 +542,69 @@ class UltimatePhoneBook(ctk.CTk):
         except:
             return False
 
+    def on_employees_changed(self, event, payload=None):
+        """Обработчик изменений справочника в DatabaseManager; может вызываться из любого потока"""
+        if event == "reset":
+            self._employees_reset.set()
+
+    def poll_employee_changes(self):
+        """Перечитывает таблицу, если справочник был сброшен в фоне"""
+        if self._is_closing:
+            return
+        if self._employees_reset.is_set():
+            self._employees_reset.clear()
+            if self._search_query and self._search_query[0] and self.active_frame is None:
+                # Прошлый результат поиска устарел - запрос выполняется заново
+                self._last_search = None
+                self.perform_search()
+            else:
+                self.load_data_from_db()
+        self.after(CHANGE_POLL_MS, self.poll_employee_changes)
+
+    def update_sync_status(self):
+        if self._is_closing:
+            return
+        self.refresh_sync_status()
+        self.after(SYNC_STATUS_MS, self.update_sync_status)
+
+    def refresh_sync_status(self):
+        """Показывает число неотправленных и отклоненных изменений реплики"""
+        replica = self.db_manager.replica
+        if replica is None:
+            return
+        try:
+            pending = replica.pending_count()
+            conflicts = len(replica.conflicts())
+        except Exception as e:
+            print(f"Ошибка чтения состояния реплики: {e}")
+            return
+        parts = []
+        color = "#27AE60"
+        if pending:
+            parts.append(f"⇅ Не отправлено: {pending}" + ("" if replica.online else " (нет связи)"))
+            color = COLOR_WARNING
+        if conflicts:
+            parts.append(f"⚠ Отклонено: {conflicts} (подробнее)")
+            color = COLOR_ERROR
+        self.sync_label.configure(text="\n".join(parts) or "⇅ Синхронизировано", text_color=color)
+
+    def show_sync_conflicts(self):
+        """Список изменений, отклоненных сервером; после просмотра они убираются из очереди"""
+        replica = self.db_manager.replica
+        if replica is None or self._is_closing:
+            return
+        conflicts = replica.conflicts()
+        if not conflicts:
+            return
+        lines = [f"ID {c['employee_id']}, {SYNC_OPS.get(c['op'], c['op'])}: {str(c['last_error'])[:60]}"
+                 for c in conflicts[:3]]
+        if len(conflicts) > 3:
+            lines.append(f"...и еще {len(conflicts) - 3}")
+        replica.clear_conflicts()
+        self.refresh_sync_status()
+        show_custom_message(self, "Изменения отклонены",
+                            "Записи заменены версией с сервера:\n" + "\n".join(lines), "warning")
+
     def update_clock(self):
         if not self._is_closing:
             try:
@@ -466,6 +643,15 @@ class UltimatePhoneBook(ctk.CTk):
                                             font=("Consolas", 11), text_color="#27AE60", anchor="w")
         self.db_status_label.pack(anchor="w", pady=(0, 0))
 
+        self.busy_label = ctk.CTkLabel(bottom_frame, text="", font=("Consolas", 11), text_color=COLOR_WARNING, anchor="w")
+        self.busy_label.pack(anchor="w", pady=(0, 0))
+
+        # Состояние локальной реплики: неотправленные и отклоненные сервером изменения
+        self.sync_label = ctk.CTkLabel(bottom_frame, text="", font=("Consolas", 11), text_color="#A0A0A0",
+                                       anchor="w", cursor="hand2")
+        self.sync_label.pack(anchor="w", pady=(0, 0))
+        self.sync_label.bind("<Button-1>", lambda e: self.show_sync_conflicts())
+
         self.menu_scroll_frame = ctk.CTkScrollableFrame(self.sidebar, fg_color="transparent", corner_radius=0)
         self.menu_scroll_frame.pack(side="top", fill="both", expand=True)
         
@@ -481,8 +667,10 @@ class UltimatePhoneBook(ctk.CTk):
         sep2 = ctk.CTkFrame(self.menu_scroll_frame, height=2, fg_color="#333333")
         sep2.pack(fill="x", padx=20, pady=10)
         
-        self.create_menu_btn(self.menu_scroll_frame, "🔄", "Обновить базу", self.refresh_data, HOVER_DARK)
+        self.create_menu_btn(self.menu_scroll_frame, "🔄", "Обновить базу", lambda: self.refresh_data(force=True), HOVER_DARK)
         self.create_menu_btn(self.menu_scroll_frame, "📊", "Экспорт в Excel", self.export_data, HOVER_DARK)
+        if self.current_user.get('role') in ['admin', 'operator']:
+            self.create_menu_btn(self.menu_scroll_frame, "📥", "Импорт", self.import_data, HOVER_DARK)
         
         if HAS_MATPLOTLIB:
              self.create_menu_btn(self.menu_scroll_frame, "📈", "Статистика", self.show_statistics_view, HOVER_DARK)
@@ -615,11 +803,11 @@ class UltimatePhoneBook(ctk.CTk):
 
         self.setup_tree_style()
         columns = list(self.column_settings.keys())
-        self.tree = ttk.Treeview(tree_container, columns=columns, show="headings", selectmode="extended")
+        self.tree = VirtualTreeview(tree_container, row_height=TREE_ROW_HEIGHT, columns=columns, show="headings", selectmode="extended")
 
-        for col_id in columns:
+        for col_index, col_id in enumerate(columns):
             settings = self.column_settings[col_id]
-            self.tree.heading(col_id, text=settings["text"], command=self.autosize_columns)
+            self.tree.heading(col_id, text=settings["text"], command=lambda i=col_index: self.on_heading_click(i))
             anchor = "center" if col_id in ["id", "campus", "room"] else "w"
             should_stretch = settings.get("stretch", False)
             self.tree.column(col_id, width=settings["width"], minwidth=settings["min"], stretch=should_stretch, anchor=anchor)
@@ -642,59 +830,67 @@ class UltimatePhoneBook(ctk.CTk):
              show_custom_message(self, "Ошибка", "Библиотека matplotlib не установлена!", "error")
              return
 
-        employees = self.db_manager.get_all_employees()
-        if not employees:
-            show_custom_message(self, "Инфо", "Нет данных для статистики", "warning")
-            return
-        
-        depts = [e[3] for e in employees]
-        campuses = [e[5] for e in employees]
-        dept_counts = Counter(depts)
-        campus_counts = Counter(campuses)
+        def load_statistics():
+            load_matplotlib()
+            return self.stats.figure(self._render_statistics_figure)
 
-        stats_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")
-        ctk.CTkLabel(stats_frame, text="📈 Статистика базы данных", font=("Segoe UI", 24, "bold")).pack(anchor="w", pady=(0, 20))
+        self.worker.submit(load_statistics, key="statistics",
+                           on_success=self._build_statistics_view,
+                           on_error=lambda e: show_custom_message(self, "Ошибка", f"Не удалось загрузить статистику: {e}", "error"))
 
-        plt.style.use("dark_background")
-        fig = plt.figure(figsize=(10, 6), facecolor=COLOR_BG)
-        
-        ax1 = fig.add_subplot(121)
-        colors = ["#3B8ED0", "#27AE60", "#E67E22", "#E74C3C", "#8E44AD", "#F1C40F"]
-        
-        wedges, texts, autotexts = ax1.pie(campus_counts.values(), labels=campus_counts.keys(), autopct="%1.1f%%", 
-                startangle=90, colors=colors, wedgeprops=dict(width=0.5, edgecolor=COLOR_BG), pctdistance=0.75)
-        
-        for autotext in autotexts:
-            autotext.set_color("white")
-            autotext.set_fontsize(9)
-            autotext.set_fontweight("bold")
-            
-        ax1.set_title("Сотрудники по корпусам", color="white", pad=20, fontsize=14)
+    def _render_statistics_figure(self, campus_counts, dept_counts):
+        """Строит фигуру в фоновом потоке; пока данные не меняются, StatisticsService отдает ее из кэша"""
+        with mpl_style.context("dark_background"):
+            fig = Figure(figsize=(10, 6), facecolor=COLOR_BG)
 
-        ax2 = fig.add_subplot(122)
-        dept_names = list(dept_counts.keys())
-        dept_vals = list(dept_counts.values())
-        
-        bars = ax2.barh(dept_names, dept_vals, color=COLOR_ACCENT, height=0.6)
-        ax2.set_title("Сотрудники по отделам", color="white", pad=20, fontsize=14)
-        
-        ax2.spines["top"].set_visible(False)
-        ax2.spines["right"].set_visible(False)
-        ax2.spines["left"].set_color("#444444")
-        ax2.spines["bottom"].set_color("#444444")
-        
-        for bar in bars:
-            width = bar.get_width()
-            ax2.text(width + 0.1, bar.get_y() + bar.get_height()/2, 
-                     f"{int(width)}", ha="left", va="center", color="white", fontweight="bold")
+            ax1 = fig.add_subplot(121)
+            colors = ["#3B8ED0", "#27AE60", "#E67E22", "#E74C3C", "#8E44AD", "#F1C40F"]
+
+            wedges, texts, autotexts = ax1.pie(campus_counts.values(), labels=[str(c) for c in campus_counts.keys()], autopct="%1.1f%%",
+                    startangle=90, colors=colors, wedgeprops=dict(width=0.5, edgecolor=COLOR_BG), pctdistance=0.75)
+
+            for autotext in autotexts:
+                autotext.set_color("white")
+                autotext.set_fontsize(9)
+                autotext.set_fontweight("bold")
 
-        ax2.grid(axis="x", linestyle="--", alpha=0.3)
+            ax1.set_title("Сотрудники по корпусам", color="white", pad=20, fontsize=14)
 
-        for ax in [ax1, ax2]:
-            ax.set_facecolor(COLOR_BG)
-            ax.tick_params(colors="white")
+            ax2 = fig.add_subplot(122)
+            dept_names = list(dept_counts.keys())
+            dept_vals = list(dept_counts.values())
 
-        fig.tight_layout(pad=3.0)
+            bars = ax2.barh(dept_names, dept_vals, color=COLOR_ACCENT, height=0.6)
+            ax2.set_title("Сотрудники по отделам", color="white", pad=20, fontsize=14)
+
+            ax2.spines["top"].set_visible(False)
+            ax2.spines["right"].set_visible(False)
+            ax2.spines["left"].set_color("#444444")
+            ax2.spines["bottom"].set_color("#444444")
+
+            for bar in bars:
+                width = bar.get_width()
+                ax2.text(width + 0.1, bar.get_y() + bar.get_height()/2,
+                         f"{int(width)}", ha="left", va="center", color="white", fontweight="bold")
+
+            ax2.grid(axis="x", linestyle="--", alpha=0.3)
+
+            for ax in [ax1, ax2]:
+                ax.set_facecolor(COLOR_BG)
+                ax.tick_params(colors="white")
+
+            fig.tight_layout(pad=3.0)
+        return fig
+
+    def _build_statistics_view(self, fig):
+        if self._is_closing:
+            return
+        if fig is None:
+            show_custom_message(self, "Инфо", "Нет данных для статистики", "warning")
+            return
+
+        stats_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")
+        ctk.CTkLabel(stats_frame, text="📈 Статистика базы данных", font=("Segoe UI", 24, "bold")).pack(anchor="w", pady=(0, 20))
 
         canvas_frame = ctk.CTkFrame(stats_frame, fg_color=COLOR_CARD, corner_radius=15)
         canvas_frame.pack(fill="both", expand=True)
@@ -869,14 +1065,13 @@ class UltimatePhoneBook(ctk.CTk):
                 return
             
             try:
-                if self.db_manager.user_exists(login):
-                    show_custom_message(dialog, "Ошибка", "Пользователь уже существует", "error")
-                    return
-                
-                if self.db_manager.add_user(login, password, role):
+                created = self.db_manager.create_user(login, password, role)
+                if created:
                     show_custom_message(self, "Успех", f"Пользователь {login} создан!", "success")
                     dialog.destroy()
                     self.show_users_view()
+                elif created is False:
+                    show_custom_message(dialog, "Ошибка", "Пользователь уже существует", "error")
                 else:
                     show_custom_message(dialog, "Ошибка", "Ошибка БД", "error")
             except Exception as e:
@@ -912,73 +1107,135 @@ class UltimatePhoneBook(ctk.CTk):
         style = ttk.Style()
         style.theme_use("clam")
         style.layout("Treeview", [('Treeview.treearea', {'sticky': 'nswe'})])
-        style.configure("Treeview", background="#2b2b2b", foreground="#ffffff", fieldbackground="#2b2b2b", rowheight=45,
+        style.configure("Treeview", background="#2b2b2b", foreground="#ffffff", fieldbackground="#2b2b2b", rowheight=TREE_ROW_HEIGHT,
                         font=("Segoe UI", 12), borderwidth=0, highlightthickness=0, relief="flat")
         style.configure("Treeview.Heading", background="#202020", foreground="#b0b0b0", font=("Segoe UI", 12, "bold"),
                         relief="flat", borderwidth=0)
         style.map("Treeview.Heading", background=[('active', '#333333')])
         style.map("Treeview", background=[('selected', COLOR_ACCENT)], foreground=[('selected', 'white')])
 
-    def load_data_from_db(self):
+    def on_busy_change(self, busy):
+        if self._is_closing or not hasattr(self, 'busy_label'):
+            return
         try:
-            self.tree.delete(*self.tree.get_children())
-            employees = self.db_manager.get_all_employees()
-            for emp in employees:
-                self.tree.insert("", "end", values=emp)
+            self.busy_label.configure(text="⏳ Выполняется запрос..." if busy else "")
+        except Exception:
+            pass
+
+    def load_data_from_db(self, force=False, autosize=False):
+        self._search_query = None
+        self._last_search = None
+
+        def on_loaded(employees):
+            self.fill_tree(employees)
             self.count_label.configure(text=f"Всего записей: {len(employees)}")
-        except Exception as e:
+            if autosize:
+                self.autosize_columns()
+
+        def on_error(e):
             if not self._is_closing: show_custom_message(self, "Ошибка", f"Не удалось загрузить данные: {str(e)}", "error")
 
+        self.worker.submit(self.db_manager.get_all_employees, force=force, key="employees",
+                           on_success=on_loaded, on_error=on_error)
+
+    def fill_tree(self, employees):
+        if self._is_closing:
+            return
+        self.tree.set_rows(employees)
+
+    def on_heading_click(self, col_index):
+        self.tree.sort_by(col_index)
+        self._applied_widths.clear()
+        self.apply_column_widths(self.autosizer.widths(self.tree.rows))
+
     def autosize_columns(self):
         if self._is_closing: return
-        padding = 25
-        for col_index, col_id in enumerate(self.column_settings.keys()):
-            settings = self.column_settings[col_id]
-            header_text = settings["text"]
-            max_width = self.header_font.measure(header_text) + padding
-            for item in self.tree.get_children():
-                cell_value = str(self.tree.item(item, 'values')[col_index])
-                text_width = self.table_font.measure(cell_value) + padding
-                if text_width > max_width: max_width = text_width
-            final_width = max(settings["min"], max_width)
-            self.tree.column(col_id, width=final_width)
+        self.apply_column_widths(self.autosizer.compute(self.tree.rows))
+
+    def apply_column_widths(self, widths):
+        for col_id, width in zip(self.column_settings.keys(), widths):
+            final_width = max(self.column_settings[col_id]["min"], width)
+            if self._applied_widths.get(col_id) != final_width:
+                self.tree.column(col_id, width=final_width)
+                self._applied_widths[col_id] = final_width
+
+    def apply_employee_change(self, row=None, removed_ids=()):
+        """Точечно обновляет таблицу после добавления, изменения или удаления записей"""
+        if self._is_closing:
+            return
+        # При активном поиске строка, переставшая подходить под запрос, убирается из выдачи
+        last = self._last_search
+        if row is not None and last and not self.db_manager.filter_employees([row], last[0], last[1]):
+            removed_ids = [*removed_ids, row[0]]
+            row = None
+        removed = self.tree.remove_keys(removed_ids)
+        if row is not None:
+            old = self.tree.upsert_row(row)
+            if old is not None:
+                removed.append(old)
+        self.autosizer.remove_rows(removed)
+        if row is not None:
+            self.autosizer.add_rows([row])
+        self.apply_column_widths(self.autosizer.widths(self.tree.rows))
+        if last:
+            self._last_search = (last[0], last[1], list(self.tree.rows))
+            self.count_label.configure(text=f"Найдено записей: {len(self.tree.rows)}")
+            self.search_indicator.configure(text=f"{len(self.tree.rows)}")
+        else:
+            self.count_label.configure(text=f"Всего записей: {len(self.tree.rows)}")
+        if self.active_frame is None:
+            self.show_employee_list()
 
     def on_search_change(self, event=None):
-        self.after(500, self.perform_search)
+        """Откладывает поиск до паузы в наборе: выполняется только последний запрос"""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._run_debounced_search)
+
+    def _run_debounced_search(self):
+        self._search_after_id = None
+        self.perform_search(skip_unchanged=True)
 
     def on_filter_change(self, value):
         self.perform_search()
 
-    def perform_search(self):
+    def perform_search(self, skip_unchanged=False):
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+
         if self.active_frame is not None:
              self.show_employee_list()
              
         search_text = self.search_entry.get().strip()
-        filter_type = self.filter_segment.get()
+        field = SEARCH_FILTERS.get(self.filter_segment.get(), "all")
+        query = (search_text.lower(), field)
+        if skip_unchanged and query == self._search_query:
+            return
+
         if not search_text:
             self.refresh_data()
+            self._search_query = query
             self.search_indicator.configure(text="")
             return
-        try:
-            self.tree.delete(*self.tree.get_children())
-            employees = self.db_manager.get_all_employees()
-            filtered = []
-            for emp in employees:
-                if filter_type == "Все":
-                    if (search_text.lower() in emp[1].lower() or search_text.lower() in emp[2].lower() or search_text.lower() in emp[3].lower()):
-                        filtered.append(emp)
-                elif filter_type == "ФИО":
-                    if search_text.lower() in emp[1].lower(): filtered.append(emp)
-                elif filter_type == "Телефон":
-                    if search_text.lower() in emp[2].lower(): filtered.append(emp)
-                elif filter_type == "Отдел":
-                    if search_text.lower() in emp[3].lower(): filtered.append(emp)
-            for emp in filtered:
-                self.tree.insert("", "end", values=emp)
+        self._search_query = query
+
+        def on_found(filtered):
+            self._last_search = (query[0], field, filtered)
+            self.fill_tree(filtered)
             self.count_label.configure(text=f"Найдено записей: {len(filtered)}")
             self.search_indicator.configure(text=f"{len(filtered)}")
-        except Exception as e:
-            show_custom_message(self, "Ошибка", f"Ошибка поиска: {str(e)}", "error")
+
+        # Новый запрос содержит предыдущий - достаточно отфильтровать прошлый результат
+        last = self._last_search
+        if last and last[1] == field and last[0] in query[0]:
+            self.worker.cancel("employees")
+            on_found(self.db_manager.filter_employees(last[2], search_text, field))
+            return
+
+        self.worker.submit(self.db_manager.search_employees, search_text, field,
+                           key="employees", on_success=on_found,
+                           on_error=lambda e: show_custom_message(self, "Ошибка", f"Ошибка поиска: {str(e)}", "error"))
 
     def reset_search(self):
         self.search_entry.delete(0, 'end')
@@ -1003,7 +1260,7 @@ class UltimatePhoneBook(ctk.CTk):
         self.tooltip.hidetip()
 
     def on_double_click(self, event):
-        if self.tree.identify_region(event.x, event.y) in ["cell", "tree"] and self.tree.selection():
+        if self.tree.identify_region(event.x, event.y) in ["cell", "tree"] and self.tree.selected_rows():
             self.edit_record()
 
     def open_add_dialog(self):
@@ -1036,15 +1293,14 @@ class UltimatePhoneBook(ctk.CTk):
              self.show_employee_list()
              return
 
-        selection = self.tree.selection()
+        selection = self.tree.selected_rows()
         if not selection:
             show_custom_message(self, "Предупреждение", "Выберите запись!", "warning")
             return
         if len(selection) > 1:
             show_custom_message(self, "Ошибка", "Для редактирования выберите только одного сотрудника!", "warning")
             return
-        item = selection[0]
-        employee_data = self.tree.item(item, 'values')
+        employee_data = selection[0]
         dialog = EmployeeDialog(self, "Редактировать сотрудника", self.db_manager, employee_data)
         dialog.wait_window()
 
@@ -1057,7 +1313,7 @@ class UltimatePhoneBook(ctk.CTk):
             show_custom_message(self, "Ошибка", "У вас недостаточно прав для удаления записей!", "warning")
             return
             
-        selected_items = self.tree.selection() 
+        selected_items = self.tree.selected_rows()
             
         if not selected_items:
             show_custom_message(self, "Ошибка", "Выберите одну или несколько записей для удаления.", "warning")
@@ -1065,9 +1321,9 @@ class UltimatePhoneBook(ctk.CTk):
                 
         def confirm_and_delete():
             emp_ids_to_delete = []
-            for item in selected_items:
+            for row in selected_items:
                 try:
-                    emp_id = int(self.tree.item(item, 'values')[0]) 
+                    emp_id = int(row[0]) 
                     emp_ids_to_delete.append(emp_id)
                 except (IndexError, ValueError):
                     continue
@@ -1076,17 +1332,20 @@ class UltimatePhoneBook(ctk.CTk):
                 show_custom_message(self, "Ошибка", "Не удалось извлечь ID выбранных записей.", "error")
                 return
 
-            try:
-                if self.db_manager.delete_employees_bulk(emp_ids_to_delete):
+            def on_deleted(ok):
+                if ok:
                     show_custom_message(self, "Успех", f"Успешно удалено {len(emp_ids_to_delete)} записей.", "success")
-                    self.refresh_data() 
+                    self.apply_employee_change(removed_ids=emp_ids_to_delete)
                 else:
                     show_custom_message(self, "Ошибка", "Не удалось удалить записи из базы данных.", "error")
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
+
+            def on_error(e):
+                traceback.print_exception(type(e), e, e.__traceback__)
                 show_custom_message(self, "Ошибка", f"Произошла ошибка при удалении: {str(e)}", "error")
 
+            self.worker.submit(self.db_manager.delete_employees_bulk, emp_ids_to_delete,
+                               on_success=on_deleted, on_error=on_error)
+
         CustomConfirmDialog(
             self, 
             "Подтверждение удаления", 
@@ -1095,10 +1354,9 @@ class UltimatePhoneBook(ctk.CTk):
         )
 
 
-    def refresh_data(self):
+    def refresh_data(self, force=False):
         try:
-            self.load_data_from_db()
-            self.autosize_columns()
+            self.load_data_from_db(force=force, autosize=True)
             self.status_label.configure(text=f"● {self.current_user['username']} ({self.current_user['role']})")
             if self.active_frame is None:
                 self.show_employee_list()
@@ -1107,32 +1365,72 @@ class UltimatePhoneBook(ctk.CTk):
 
 
     def export_data(self):
-        if not self.db_manager.connect():
-            show_custom_message(self, "Ошибка", "Нет подключения к базе данных!", "error")
+        # Экспортируется то, что видит пользователь: выделенные строки или текущий результат поиска.
+        # Снимок делается в потоке Tk, повторного чтения из БД не требуется.
+        rows = self.tree.selected_rows() or list(self.tree.rows)
+        if not rows and self.search_entry.get().strip():
+            show_custom_message(self, "Ошибка", "Нет данных для экспорта", "error")
             return
-        
+
         default_filename = f"Employee_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
         file_path = tk.filedialog.asksaveasfilename(
         defaultextension=".xlsx",
         initialfile=default_filename,
-        filetypes=[("Excel files", "*.xlsx")],
+        filetypes=[(f"{cls.description} files", f"*{cls.extension}") for cls in available_exporters()],
         title="Выберите место и имя для сохранения отчета"
     )
 
         if not file_path:
             return
 
-        employees = self.db_manager.get_all_employees()
-        exporter = DataExporter(self.db_manager)
+        exporter = exporter_for_path(file_path, self.db_manager)
 
-        success, message = exporter.export_to_excel(employees, out_path=file_path)
+        def do_export():
+            if rows:
+                return exporter.export(rows, out_path=file_path)
+            if not self.db_manager.connect():
+                return False, "Нет подключения к базе данных!"
+            return exporter.export(None, out_path=file_path)
 
-        if success:
-            show_custom_message(self, "Успех", message, "success")
-        else:
-            show_custom_message(self, "Ошибка", message, "error")
+        def on_exported(result):
+            success, message = result
+            if success:
+                show_custom_message(self, "Успех", message, "success")
+            else:
+                show_custom_message(self, "Ошибка", message, "error")
+
+        self.worker.submit(do_export, key="export", on_success=on_exported,
+                           on_error=lambda e: show_custom_message(self, "Ошибка", f"Ошибка экспорта: {e}", "error"))
+
+
+    def import_data(self):
+        if self.current_user.get('role') not in ['admin', 'operator']:
+            show_custom_message(self, "Ошибка", "Недостаточно прав!", "warning")
+            return
+
+        file_path = tk.filedialog.askopenfilename(
+            filetypes=[("Таблицы", "*.csv *.xlsx"), ("CSV files", "*.csv"), ("Excel files", "*.xlsx")],
+            title="Выберите файл со списком сотрудников"
+        )
+        if not file_path:
+            return
+
+        importer = EmployeeImporter(self.db_manager)
+
+        def do_import():
+            if not self.db_manager.connect():
+                raise ConnectionError("Нет подключения к базе данных!")
+            return importer.import_file(file_path)
 
+        def on_imported(result):
+            type_ = "success" if not result.errors else ("warning" if result.imported else "error")
+            show_custom_message(self, "Импорт", result.summary(max_errors=5), type_)
+            if result.imported:
+                self.refresh_data(force=True)
+
+        self.worker.submit(do_import, key="import", on_success=on_imported,
+                           on_error=lambda e: show_custom_message(self, "Ошибка", f"Ошибка импорта: {e}", "error"))
 
     def logout(self):
         def do_logout():
@@ -1153,6 +1451,7 @@ class UltimatePhoneBook(ctk.CTk):
         if self._is_closing: return
         self._is_closing = True
         try:
+            if hasattr(self, 'worker'): self.worker.shutdown()
             if hasattr(self, 'db_manager'): self.db_manager.close()
         except: pass
         finally:
@@ -1195,8 +1494,9 @@ class EmployeeDialog(ctk.CTkToplevel):
         self.room_entry = self.create_form_field(form_frame, "Кабинет:*", 5)
         button_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
         button_frame.grid(row=6, column=0, columnspan=2, pady=30, sticky="ew")
-        ctk.CTkButton(button_frame, text="Сохранить", command=self.save_employee,
-                      fg_color=COLOR_ACCENT, font=("Segoe UI", 14, "bold")).pack(side="right", padx=(10, 0))
+        self.save_button = ctk.CTkButton(button_frame, text="Сохранить", command=self.save_employee,
+                                         fg_color=COLOR_ACCENT, font=("Segoe UI", 14, "bold"))
+        self.save_button.pack(side="right", padx=(10, 0))
         ctk.CTkButton(button_frame, text="Отмена", command=self.cancel,
                       fg_color="#3a3a3a", font=("Segoe UI", 14)).pack(side="right")
 
@@ -1208,57 +1508,63 @@ class EmployeeDialog(ctk.CTkToplevel):
 
     def fill_form(self):
         if self.employee_data:
-            self.fio_entry.insert(0, self.employee_data[1])
-            self.phone_entry.insert(0, self.employee_data[2])
-            self.department_entry.insert(0, self.employee_data[3])
-            self.position_entry.insert(0, self.employee_data[4])
-            self.campus_entry.insert(0, self.employee_data[5])
-            self.room_entry.insert(0, self.employee_data[6])
+            entries = [self.fio_entry, self.phone_entry, self.department_entry,
+                       self.position_entry, self.campus_entry, self.room_entry]
+            for entry, value in zip(entries, self.employee_data[1:]):
+                entry.insert(0, "" if value is None else str(value))
 
     def save_employee(self):
-        fio = self.fio_entry.get().strip()
-        phone = self.phone_entry.get().strip()
-        department = self.department_entry.get().strip()
-        position = self.position_entry.get().strip()
-        campus = self.campus_entry.get().strip()
-        room = self.room_entry.get().strip()
-
-        if not all([fio, phone, department, position, campus, room]):
-            show_custom_message(self, "Ошибка", "Все поля обязательны для заполнения!", "error")
+        if self.save_button.cget("state") == "disabled":
             return
-
-        if not re.match(r"^\+?[0-9\-\(\)\s]{5,20}$", phone):
-             show_custom_message(self, "Ошибка", "Некорректный формат телефона!\nПример: +7(999)123-45-67", "warning")
-             return
-
-        room_clean = "".join(c for c in room if c.isalnum()).upper()
-        if not room_clean:
-            show_custom_message(self, "Ошибка", "Кабинет не может быть пустым после очистки.", "error")
+        try:
+            fio, phone, department, position, campus, room = validate_employee(
+                self.fio_entry.get(), self.phone_entry.get(), self.department_entry.get(),
+                self.position_entry.get(), self.campus_entry.get(), self.room_entry.get())
+        except EmployeeValidationError as e:
+            show_custom_message(self, "Ошибка", str(e), e.level)
             return
-        room = room_clean
 
-        try:
-            if self.employee_data:
-                success = self.db_manager.update_employee(self.employee_data[0], fio, phone, department, position, campus, room)
-                action = "обновлена"
-            else:
-                success = self.db_manager.add_employee(fio, phone, department, position, campus, room)
-                action = "добавлена"
+        if self.employee_data:
+            task = (self.db_manager.update_employee, self.employee_data[0], fio, phone, department, position, campus, room)
+            action = "обновлена"
+        else:
+            task = (self.db_manager.add_employee, fio, phone, department, position, campus, room)
+            action = "добавлена"
+        values = (fio, phone, department, position, campus, room)
+
+        def on_saved(success):
+            if not self.winfo_exists():
+                return
+            self.save_button.configure(state="normal")
             if success:
+                emp_id = int(self.employee_data[0]) if self.employee_data else success
                 msg_dialog = CustomMessageDialog(self, "Успех", f"Запись успешно {action}!", "success")
                 self.wait_window(msg_dialog) 
-                self.parent.refresh_data()
+                self.parent.apply_employee_change(row=(emp_id,) + values)
                 self.destroy()
             else:
-                show_custom_message(self, "Ошибка", f"Не удалось {action} запись!", "error")
-        except Exception as e:
+                message = f"Запись не {action}!"
+                if self.db_manager.replica is not None:
+                    # Отклоненное сервером изменение уже заменено актуальной версией записи
+                    message += " Изменение отклонено сервером, загружена актуальная версия."
+                    self.parent.refresh_sync_status()
+                show_custom_message(self, "Ошибка", message, "error")
+
+        def on_error(e):
+            if not self.winfo_exists():
+                return
+            self.save_button.configure(state="normal")
             show_custom_message(self, "Ошибка", f"Произошла ошибка: {str(e)}", "error")
 
+        self.save_button.configure(state="disabled")
+        self.parent.worker.submit(*task, on_success=on_saved, on_error=on_error)
+
     def cancel(self):
         self.destroy()
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     try:
         app = UltimatePhoneBook()
         if app.winfo_exists():
@@ -0,0 +1,157 @@
+"""
+Версионированные миграции схемы БД.
+
+Применённые миграции записываются в таблицу schema_version. Каждая миграция
+идемпотентна: перед изменением проверяет, что колонки или индекса еще нет, поэтому
+базы, созданные до появления миграций, доводятся до актуальной схемы без ручного DDL.
+DDL в MySQL/TiDB не транзакционный, так что при сбое миграция просто повторяется
+при следующем запуске.
+
+    python migrations.py            # применить недостающие миграции
+    python migrations.py --status   # показать состояние
+"""
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INT PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class Migration:
+    def __init__(self, version, name, apply):
+        self.version = version
+        self.name = name
+        self.apply = apply
+
+    def __repr__(self):
+        return f"Migration({self.version}, {self.name!r})"
+
+
+def ensure_columns(db, table, columns):
+    """Добавляет в таблицу недостающие колонки {имя: определение}"""
+    existing = db._table_columns(table)
+    ok = True
+    for name, definition in columns.items():
+        if name not in existing:
+            ok = bool(db.execute_query(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")) and ok
+    return ok
+
+
+def ensure_index(db, table, name, columns):
+    rows = db.execute_query(db.storage.index_query, (table,), fetchall=True)
+    if rows is None:
+        return False
+    if name in {r['name'] for r in rows}:
+        return True
+    return bool(db.execute_query(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+def _create_tables(db):
+    ok = True
+    for statement in db.storage.schema():
+        ok = bool(db.execute_query(statement)) and ok
+    return ok
+
+
+def _add_tracking_columns(db):
+    # Таблицы, созданные до появления меток изменений, дополняются ими
+    return ensure_columns(db, "employees", db.storage.tracking_columns)
+
+
+def _add_indexes(db):
+    # campus/room - фильтры и статистика, updated_at и deleted_at - выборка изменений репликами
+    ok = ensure_index(db, "employees", "idx_employees_campus", ("campus",))
+    ok = ensure_index(db, "employees", "idx_employees_room", ("room",)) and ok
+    ok = ensure_index(db, "employees", "idx_employees_updated", ("updated_at",)) and ok
+    ok = ensure_index(db, "employee_tombstones", "idx_tombstones_deleted", ("deleted_at",)) and ok
+    return ok
+
+
+def _create_blind_index(db):
+    # Таблицы слепого индекса есть в каждой базе: индекс ведут все клиенты с ключом шифрования,
+    # а employee_bidx_state хранит row_version, по которой построены токены строки
+    ok = True
+    for statement in db.storage.blind_index_schema():
+        ok = bool(db.execute_query(statement)) and ok
+    return ok
+
+
+# Порядок важен: номера только растут, уже выпущенные миграции не меняются
+MIGRATIONS = [
+    Migration(1, "create tables", _create_tables),
+    Migration(2, "employees change tracking", _add_tracking_columns),
+    Migration(3, "employees indexes", _add_indexes),
+    Migration(4, "blind index tables", _create_blind_index),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+class Migrator:
+    def __init__(self, db_manager, migrations=MIGRATIONS):
+        self.db = db_manager
+        self.migrations = sorted(migrations, key=lambda m: m.version)
+
+    def applied_versions(self):
+        if not self.db.execute_query(SCHEMA_VERSION_TABLE):
+            raise RuntimeError("не удалось создать таблицу schema_version")
+        rows = self.db.execute_query("SELECT version FROM schema_version", fetchall=True)
+        if rows is None:
+            raise RuntimeError("не удалось прочитать schema_version")
+        return {int(r['version']) for r in rows}
+
+    def pending(self):
+        applied = self.applied_versions()
+        return [m for m in self.migrations if m.version not in applied]
+
+    def migrate(self):
+        """Применяет недостающие миграции по порядку; на первой неудачной останавливается"""
+        try:
+            pending = self.pending()
+        except Exception as e:
+            print(f"Ошибка миграции схемы: {e}")
+            return False
+        for migration in pending:
+            try:
+                ok = migration.apply(self.db)
+            except Exception as e:
+                print(f"Ошибка миграции {migration.version} ({migration.name}): {e}")
+                return False
+            if not ok:
+                print(f"Миграция {migration.version} ({migration.name}) не выполнена")
+                return False
+            # Параллельный запуск мог уже записать эту версию - повтор не считается ошибкой
+            self.db.execute_query("REPLACE INTO schema_version (version, name) VALUES (%s, %s)",
+                                  (migration.version, migration.name))
+            print(f"Применена миграция {migration.version}: {migration.name}")
+        return True
+
+
+def main(argv=None):
+    import argparse
+    from database import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--status", action="store_true", help="Только показать примененные и ожидающие миграции")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager()
+    try:
+        if not db.connect():
+            return 1
+        migrator = Migrator(db)
+        pending = migrator.pending()
+        for migration in migrator.migrations:
+            mark = " " if migration in pending else "x"
+            print(f"[{mark}] {migration.version}: {migration.name}")
+        if args.status or not pending:
+            return 0
+        return 0 if migrator.migrate() else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
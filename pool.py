@@ -0,0 +1,154 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class PooledConnection:
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Ограниченный потокобезопасный пул соединений.
+    Проверка соединения (ping) выполняется только если оно простаивало дольше
+    idle_check секунд, а слишком старые соединения пересоздаются.
+    """
+    def __init__(self, factory, max_size=5, idle_check=30, max_age=1800, timeout=10, ping=None):
+        self._factory = factory
+        self._ping = ping or (lambda conn: conn.ping(reconnect=False))
+        self.max_size = max_size
+        self.idle_check = idle_check
+        self.max_age = max_age
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "in_use": 0,
+            "created": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "waits": 0,
+            "timeouts": 0,
+        }
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Пул соединений закрыт")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._size >= self.max_size:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError("Нет свободных соединений в пуле")
+            self._stats["in_use"] += 1
+
+        try:
+            if entry is None:
+                entry = self._create()
+            else:
+                entry = self._validate(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._stats["in_use"] -= 1
+                self._cond.notify()
+            raise
+        return entry
+
+    def _create(self):
+        entry = PooledConnection(self._factory())
+        with self._cond:
+            self._stats["created"] += 1
+        return entry
+
+    def _validate(self, entry):
+        now = time.monotonic()
+        if now - entry.created_at > self.max_age:
+            self._close_raw(entry)
+            with self._cond:
+                self._stats["reconnects"] += 1
+            return self._create()
+        if now - entry.last_used > self.idle_check:
+            try:
+                self._ping(entry.raw)
+            except Exception:
+                self._close_raw(entry)
+                with self._cond:
+                    self._stats["reconnects"] += 1
+                return self._create()
+        return entry
+
+    def release(self, entry, discard=False):
+        if discard or self._closed:
+            self._close_raw(entry)
+        else:
+            entry.last_used = time.monotonic()
+        with self._cond:
+            self._stats["in_use"] -= 1
+            if discard or self._closed:
+                self._size -= 1
+                if discard:
+                    self._stats["discarded"] += 1
+            else:
+                self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        entry = self.acquire()
+        try:
+            yield entry.raw
+        except Exception:
+            self.release(entry, discard=True)
+            raise
+        else:
+            self.release(entry)
+
+    def metrics(self):
+        with self._cond:
+            data = dict(self._stats)
+            data["idle"] = len(self._idle)
+            data["size"] = self._size
+            data["max_size"] = self.max_size
+        return data
+
+    @staticmethod
+    def _close_raw(entry):
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._close_raw(entry)
@@ -0,0 +1,496 @@
+"""
+Локальная реплика таблицы employees.
+
+Все чтения сотрудников обслуживает файл SQLite на диске, поэтому задержки и обрывы
+связи с сервером не останавливают справочник. Синхронизация:
+
+* pull - с сервера забираются строки с updated_at не раньше последней метки
+  (с запасом overlap секунд) и отметки об удалении из employee_tombstones;
+* push - локальные изменения копятся в очереди outbox и отправляются по порядку.
+  Изменение и удаление применяются только если row_version на сервере совпадает
+  с версией, от которой шло локальное изменение; иначе запись помечается как конфликт
+  и строка перезаписывается серверной версией.
+
+Строки хранятся в том же зашифрованном виде, что и на сервере. Новые записи, созданные
+без связи, получают временный отрицательный id до отправки на сервер.
+"""
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from config import REPLICA_CONFIG
+from storage import SQLiteBackend
+
+EMPLOYEE_COLUMNS = ("fio", "phone", "department", "position", "campus", "room")
+
+LOCAL_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY,
+        fio TEXT NOT NULL,
+        phone TEXT NOT NULL,
+        department TEXT NOT NULL,
+        position TEXT NOT NULL,
+        campus TEXT,
+        room TEXT,
+        updated_at TEXT,
+        row_version INTEGER NOT NULL DEFAULT 1
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        employee_id INTEGER NOT NULL,
+        payload TEXT,
+        base_version INTEGER,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, seq)",
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+MARKER_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _marker(value):
+    """Метка изменения как строка: pymysql возвращает datetime, SQLite - текст"""
+    if isinstance(value, datetime):
+        return value.strftime(MARKER_FORMAT)
+    return str(value)
+
+
+class LocalReplica:
+    def __init__(self, db_manager, path=None, sync_interval=None, overlap=None):
+        self.db = db_manager
+        self.storage = SQLiteBackend(path or REPLICA_CONFIG['path'])
+        self.sync_interval = sync_interval if sync_interval is not None else REPLICA_CONFIG['sync_interval']
+        self.overlap = overlap if overlap is not None else REPLICA_CONFIG['overlap']
+        self.online = None
+        self.last_error = None
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._conn = self.storage.connect()
+        self._init_local()
+
+    # --- локальная база ---
+
+    def _init_local(self):
+        with self._lock:
+            for statement in LOCAL_SCHEMA:
+                self._execute(statement)
+            # Реплика другого сервера не годится: начинаем с чистого листа
+            server = self.db.storage.identity
+            if self._state("server") != server:
+                self._execute("DELETE FROM employees")
+                self._execute("DELETE FROM outbox")
+                self._execute("DELETE FROM sync_state")
+                self._set_state("server", server)
+            # Соответствия временных id уже никто не ждет
+            self._execute("DELETE FROM sync_state WHERE key LIKE 'id:%'")
+
+    def _execute(self, query, params=None, fetchone=False, fetchall=False):
+        with self._lock, self._conn.cursor() as cursor:
+            cursor.execute(query, params)
+            if fetchone:
+                return cursor.fetchone()
+            if fetchall:
+                return cursor.fetchall()
+            return cursor.lastrowid
+
+    def _state(self, key):
+        row = self._execute("SELECT value FROM sync_state WHERE key = %s", (key,), fetchone=True)
+        return row['value'] if row else None
+
+    def _set_state(self, key, value):
+        self._execute("REPLACE INTO sync_state (key, value) VALUES (%s, %s)", (key, value))
+
+    def read_query(self, query, params=None, fetchone=False, fetchall=False):
+        try:
+            return self._execute(query, params, fetchone=fetchone, fetchall=fetchall or not fetchone)
+        except Exception as e:
+            print(f"Ошибка чтения реплики: {e}\nЗапрос: {query}")
+            return None
+
+    def iter_employee_batches(self, batch_size, after_id=0):
+        """Отдельное соединение на чтение: WAL не блокирует запись, пока идет выборка"""
+        conn = self.storage.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM employees WHERE id > %s ORDER BY id", (after_id,))
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    yield batch
+        finally:
+            conn.close()
+
+    def pending_count(self):
+        row = self._execute("SELECT COUNT(*) AS cnt FROM outbox WHERE status = 'pending'", fetchone=True)
+        return int(row['cnt'])
+
+    def conflicts(self):
+        """Изменения, отклоненные из-за конфликта или ошибки сервера"""
+        return self._execute("SELECT seq, op, employee_id, status, last_error, created_at FROM outbox "
+                             "WHERE status <> 'pending' ORDER BY seq", fetchall=True)
+
+    def clear_conflicts(self):
+        """Убирает из очереди отклоненные изменения, которые пользователь уже видел"""
+        self._execute("DELETE FROM outbox WHERE status <> 'pending'")
+
+    def _rejected(self, seqs):
+        """Отклонено ли хотя бы одно из изменений seqs (отправленные из outbox удаляются, ждущие - pending)"""
+        seqs = [seq for seq in seqs if seq]
+        if not seqs:
+            return False
+        placeholders = ", ".join(["%s"] * len(seqs))
+        row = self._execute(f"SELECT COUNT(*) AS cnt FROM outbox WHERE seq IN ({placeholders}) "
+                            "AND status <> 'pending'", tuple(seqs), fetchone=True)
+        return int(row['cnt']) > 0
+
+    # --- локальные изменения ---
+
+    def _enqueue(self, op, emp_id, values=None, base_version=None):
+        payload = json.dumps(list(values)) if values is not None else None
+        return self._execute("INSERT INTO outbox (op, employee_id, payload, base_version) VALUES (%s, %s, %s, %s)",
+                      (op, emp_id, payload, base_version))
+
+    def _encrypt(self, fio, phone, department, position, campus, room):
+        return (*self.db.encrypt_many((fio, phone, department, position)), campus, room)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.begin()
+            try:
+                yield
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def _queue_insert(self, values):
+        # Временные id не переиспользуются, чтобы не спутать их соответствия серверным
+        temp_id = int(self._state("temp_id") or 0) - 1
+        self._set_state("temp_id", str(temp_id))
+        self._execute("INSERT INTO employees (id, fio, phone, department, position, campus, room) "
+                      "VALUES (%s, %s, %s, %s, %s, %s, %s)", (temp_id, *values))
+        self._enqueue("insert", temp_id, values)
+        return temp_id
+
+    def _queue_update(self, emp_id, values):
+        """Ставит изменение в очередь; возвращает его seq или False, если строки нет"""
+        row = self._execute("SELECT row_version FROM employees WHERE id = %s", (emp_id,), fetchone=True)
+        if row is None:
+            return False
+        self._execute("UPDATE employees SET fio=%s, phone=%s, department=%s, position=%s, campus=%s, room=%s, "
+                      "row_version = row_version + 1 WHERE id = %s", (*values, emp_id))
+        return self._enqueue("update", emp_id, values, row['row_version'])
+
+    def _queue_delete(self, emp_id):
+        row = self._execute("SELECT row_version FROM employees WHERE id = %s", (emp_id,), fetchone=True)
+        if row is None:
+            return None
+        self._execute("DELETE FROM employees WHERE id = %s", (emp_id,))
+        return self._enqueue("delete", emp_id, base_version=row['row_version'])
+
+    def add_employee(self, fio, phone, department, position, campus, room):
+        values = self._encrypt(fio, phone, department, position, campus, room)
+        with self._transaction():
+            temp_id = self._queue_insert(values)
+        self.push()
+        # Вставку, отклоненную сервером, _reject уже убрал из реплики
+        if self._execute("SELECT seq FROM outbox WHERE employee_id = %s AND status <> 'pending'",
+                         (temp_id,), fetchone=True):
+            return None
+        return self._resolved_id(temp_id)
+
+    def _resolved_id(self, temp_id):
+        """Если запись уже ушла на сервер, возвращается выданный им id"""
+        row = self._execute("SELECT value FROM sync_state WHERE key = %s", (f"id:{temp_id}",), fetchone=True)
+        if row:
+            self._execute("DELETE FROM sync_state WHERE key = %s", (f"id:{temp_id}",))
+            return int(row['value'])
+        return temp_id
+
+    def update_employee(self, emp_id, fio, phone, department, position, campus, room):
+        values = self._encrypt(fio, phone, department, position, campus, room)
+        with self._transaction():
+            seq = self._queue_update(emp_id, values)
+        if not seq:
+            return False
+        self.push()
+        # Конфликт версий или ошибка сервера: строка уже заменена серверной версией
+        return not self._rejected([seq])
+
+    def delete_employees(self, emp_ids):
+        with self._transaction():
+            seqs = [self._queue_delete(emp_id) for emp_id in emp_ids]
+        self.push()
+        return not self._rejected(seqs)
+
+    def apply_batch(self, inserts, updates, deletes):
+        """
+        Пачка уже зашифрованных изменений (DatabaseManager.apply_batch) ставится в очередь одной
+        локальной транзакцией. На сервер записи уходят по одной, каждая со своей проверкой версии.
+        Возвращает id строк, изменения которых попали в очередь и не были отклонены сервером.
+        """
+        queued = {}
+        with self._transaction():
+            for values in inserts:
+                self._queue_insert(values)
+            for emp_id, *values in updates:
+                seq = self._queue_update(emp_id, values)
+                if seq:
+                    queued[emp_id] = seq
+            for emp_id in deletes:
+                self._queue_delete(emp_id)
+        self.push()
+        return {emp_id for emp_id, seq in queued.items() if not self._rejected([seq])}
+
+    # --- отправка на сервер ---
+
+    def _apply_remote(self, op, emp_id, values, base_version):
+        """Одна запись очереди в отдельной транзакции на сервере; False - конфликт версий"""
+        now = self.db.storage.now
+        with self.db._get_pool().connection() as conn:
+            try:
+                conn.begin()
+                with conn.cursor() as cursor:
+                    if op == "insert":
+                        cursor.execute("INSERT INTO employees (fio, phone, department, position, campus, room) "
+                                       "VALUES (%s, %s, %s, %s, %s, %s)", values)
+                        result = cursor.lastrowid
+                    elif op == "update":
+                        cursor.execute("UPDATE employees SET fio=%s, phone=%s, department=%s, position=%s, campus=%s, "
+                                       f"room=%s, row_version = row_version + 1, updated_at = {now} "
+                                       "WHERE id = %s AND row_version = %s", (*values, emp_id, base_version))
+                        result = cursor.rowcount == 1
+                    else:
+                        cursor.execute("DELETE FROM employees WHERE id = %s AND row_version = %s",
+                                       (emp_id, base_version))
+                        result = cursor.rowcount == 1
+                        if not result:
+                            # Уже удалена кем-то другим - это не конфликт
+                            cursor.execute("SELECT id FROM employees WHERE id = %s", (emp_id,))
+                            result = cursor.fetchone() is None
+                        if result:
+                            cursor.execute("REPLACE INTO employee_tombstones (employee_id, deleted_at) "
+                                           f"VALUES (%s, {now})", (emp_id,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return result
+
+    def _update_server_index(self, op, emp_id, values):
+        if not self.db.blind_index:
+            return
+        if op == "delete":
+            self.db._delete_blind_index([emp_id])
+        else:
+            fio, phone, department = (self.db.decrypt_data(v) for v in values[:3])
+            self.db._write_blind_index(emp_id, fio, phone, department)
+
+    def push(self):
+        """Отправляет очередь по порядку; при обрыве связи останавливается до следующей попытки"""
+        with self._sync_lock:
+            return self._push()
+
+    def _push(self):
+        sent = 0
+        entries = self._execute("SELECT * FROM outbox WHERE status = 'pending' ORDER BY seq", fetchall=True)
+        for entry in entries:
+            # id мог смениться, пока отправлялись предыдущие записи
+            current = self._execute("SELECT employee_id FROM outbox WHERE seq = %s", (entry['seq'],), fetchone=True)
+            if current is None:
+                continue
+            emp_id = current['employee_id']
+            values = json.loads(entry['payload']) if entry['payload'] else None
+            try:
+                result = self._apply_remote(entry['op'], emp_id, values, entry['base_version'])
+            except self.db.storage.IntegrityError as e:
+                self._reject(entry['seq'], emp_id, "failed", str(e))
+                continue
+            except Exception as e:
+                self.online = False
+                self.last_error = str(e)
+                self._execute("UPDATE outbox SET attempts = attempts + 1, last_error = %s WHERE seq = %s",
+                              (str(e), entry['seq']))
+                break
+            self.online = True
+            if result is False:
+                self._reject(entry['seq'], emp_id, "conflict", "Запись изменена на сервере")
+                continue
+
+            with self._transaction():
+                if entry['op'] == "insert":
+                    new_id = result
+                    self._execute("UPDATE employees SET id = %s WHERE id = %s", (new_id, emp_id))
+                    self._execute("UPDATE outbox SET employee_id = %s WHERE employee_id = %s", (new_id, emp_id))
+                    self._set_state(f"id:{emp_id}", str(new_id))
+                    emp_id = new_id
+                self._execute("DELETE FROM outbox WHERE seq = %s", (entry['seq'],))
+            self._update_server_index(entry['op'], emp_id, values)
+            sent += 1
+        return sent
+
+    def _reject(self, seq, emp_id, status, error):
+        """Отклоняет запись и все последующие изменения той же строки, строка берется с сервера"""
+        print(f"Изменение сотрудника {emp_id} не отправлено ({status}): {error}")
+        self._execute("UPDATE outbox SET status = %s, last_error = %s WHERE employee_id = %s AND status = 'pending' "
+                      "AND seq >= %s", (status, error, emp_id, seq))
+        # Читаем напрямую из пула: execute_query глотает ошибки, и обрыв связи выглядел бы
+        # как удаленная на сервере строка. Без ответа сервера строку поправит следующий pull
+        try:
+            with self.db._get_pool().connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT * FROM employees WHERE id = %s", (emp_id,))
+                    row = cursor.fetchone()
+        except Exception as e:
+            print(f"Ошибка чтения сотрудника {emp_id} с сервера: {e}")
+            return
+        with self._lock:
+            if row:
+                self._store_rows([row])
+            else:
+                self._execute("DELETE FROM employees WHERE id = %s", (emp_id,))
+        self.db.invalidate_employee_cache()
+        self.db._notify_change("reset")
+
+    # --- получение изменений ---
+
+    def _store_rows(self, rows):
+        with self._conn.cursor() as cursor:
+            cursor.executemany(
+                "REPLACE INTO employees (id, fio, phone, department, position, campus, room, updated_at, row_version) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                [(r['id'], *(r[c] for c in EMPLOYEE_COLUMNS), _marker(r['updated_at']), r['row_version'])
+                 for r in rows])
+
+    def _pending_ids(self):
+        rows = self._execute("SELECT DISTINCT employee_id FROM outbox WHERE status = 'pending'", fetchall=True)
+        return {r['employee_id'] for r in rows}
+
+    def pull(self):
+        with self._sync_lock:
+            return self._pull()
+
+    def _local_versions(self, emp_ids):
+        placeholders = ", ".join(["%s"] * len(emp_ids))
+        rows = self._execute(f"SELECT id, row_version, updated_at FROM employees WHERE id IN ({placeholders})",
+                             tuple(emp_ids), fetchall=True)
+        return {r['id']: (r['row_version'], r['updated_at']) for r in rows}
+
+    def _pull(self, batch_size=500):
+        """
+        Забирает изменения с сервера. Строки с неотправленными локальными изменениями
+        не перезаписываются: их судьбу решит проверка версии при отправке.
+        Возвращает число примененных изменений.
+        """
+        marker = self._state("marker")
+        pending = self._pending_ids()
+        newest = None
+        changed = 0
+        seen = set()
+
+        pool = self.db._get_pool()
+        with pool.connection() as conn:
+            with conn.cursor(self.db.storage.stream_cursorclass) as cursor:
+                if marker is None:
+                    cursor.execute("SELECT * FROM employees ORDER BY id")
+                else:
+                    cursor.execute("SELECT * FROM employees WHERE updated_at >= %s ORDER BY id", (marker,))
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    seen.update(r['id'] for r in batch)
+                    for r in batch:
+                        stamp = _marker(r['updated_at'])
+                        newest = stamp if newest is None or stamp > newest else newest
+                    # Повторно выбранные из-за запаса строки без изменений не считаются
+                    local = self._local_versions([r['id'] for r in batch])
+                    rows = [r for r in batch if r['id'] not in pending
+                            and local.get(r['id']) != (r['row_version'], _marker(r['updated_at']))]
+                    if not rows:
+                        continue
+                    with self._transaction():
+                        self._store_rows(rows)
+                    changed += len(rows)
+
+            with conn.cursor() as cursor:
+                if marker is None:
+                    deleted = []
+                else:
+                    cursor.execute("SELECT employee_id, deleted_at FROM employee_tombstones WHERE deleted_at >= %s",
+                                   (marker,))
+                    deleted = cursor.fetchall()
+
+        with self._transaction():
+            if marker is None:
+                # Первая полная загрузка: убираем строки, которых на сервере уже нет
+                local = self._execute("SELECT id FROM employees WHERE id > 0", fetchall=True)
+                stale = [r['id'] for r in local if r['id'] not in seen and r['id'] not in pending]
+            else:
+                stale = [r['employee_id'] for r in deleted if r['employee_id'] not in pending]
+            for emp_id in stale:
+                self._execute("DELETE FROM employees WHERE id = %s", (emp_id,))
+            for r in deleted:
+                stamp = _marker(r['deleted_at'])
+                newest = stamp if newest is None or stamp > newest else newest
+            if newest is not None:
+                # Запас назад: транзакции, начатые раньше, могут зафиксироваться позже
+                self._set_state("marker", (datetime.fromisoformat(newest) - timedelta(seconds=self.overlap))
+                                .strftime(MARKER_FORMAT))
+            elif marker is None:
+                self._set_state("marker", "1970-01-01 00:00:00.000000")
+        changed += len(stale)
+        self.online = True
+        return changed
+
+    def sync(self):
+        """Отправка очереди и получение изменений; без связи реплика продолжает работать локально"""
+        with self._sync_lock:
+            try:
+                self._push()
+                changed = self._pull()
+            except Exception as e:
+                self.online = False
+                self.last_error = str(e)
+                print(f"Ошибка синхронизации реплики: {e}")
+                return False
+        if changed:
+            self.db.invalidate_employee_cache()
+            self.db._notify_change("reset")
+        return True
+
+    # --- фоновая синхронизация ---
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def close(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,96 @@
+"""
+Замер холодного старта.
+
+StartupTimer отмечает этапы запуска приложения (импорты, окно, БД, окно входа)
+и предупреждает, если окно входа появилось позже STARTUP_BUDGET_MS.
+
+Запуск модуля напрямую печатает отчет в духе `python -X importtime`:
+какие пакеты сколько времени импортируются при `import main`.
+
+    python startup.py
+    python startup.py --module cli --top 20 --budget 500
+"""
+import time
+
+_PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, budget_ms, verbose=False):
+        self.budget_ms = budget_ms
+        self.verbose = verbose
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, (time.perf_counter() - _PROCESS_START) * 1000))
+
+    def elapsed_ms(self):
+        return self.marks[-1][1] if self.marks else 0.0
+
+    def report(self):
+        """Печатает этапы, если включен подробный режим или превышен бюджет"""
+        over_budget = self.elapsed_ms() > self.budget_ms
+        if not (self.verbose or over_budget):
+            return over_budget
+        previous = 0.0
+        for name, at in self.marks:
+            print(f"  {name:<16} {at:8.1f} мс (+{at - previous:.1f})")
+            previous = at
+        if over_budget:
+            print(f"Запуск занял {self.elapsed_ms():.0f} мс при бюджете {self.budget_ms} мс")
+        return over_budget
+
+
+def import_times(module):
+    """Запускает `python -X importtime -c "import module"` и возвращает [(пакет, мкс)] по убыванию"""
+    import os
+    import subprocess
+    import sys
+
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "ошибка импорта")
+
+    totals = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line.split("|")
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue
+        name = parts[2]
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        package = name.strip().split(".")[0]
+        # Учитываются прямые импорты измеряемого модуля (уровень 1) и модули старта интерпретатора
+        # (уровень 0); более глубокие уже вошли в cumulative своих родителей
+        if level == 1 or (level == 0 and name.strip() != module):
+            totals[package] = totals.get(package, 0) + cumulative
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(argv=None):
+    import argparse
+    from config import STARTUP_BUDGET_MS
+
+    parser = argparse.ArgumentParser(description="Отчет о времени импорта модулей при запуске")
+    parser.add_argument("--module", default="main", help="Модуль, импорт которого измеряется")
+    parser.add_argument("--top", type=int, default=15, help="Сколько пакетов показать")
+    parser.add_argument("--budget", type=int, default=STARTUP_BUDGET_MS, help="Бюджет на импорты, мс")
+    args = parser.parse_args(argv)
+
+    times = import_times(args.module)
+    total_ms = sum(us for _, us in times) / 1000
+    print(f"Импорт {args.module}: {total_ms:.0f} мс")
+    for package, us in times[:args.top]:
+        print(f"  {us / 1000:8.1f} мс  {package}")
+    if total_ms > args.budget:
+        print(f"Превышен бюджет {args.budget} мс")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import Counter
+
+from config import EMPLOYEE_CACHE_TTL
+from database import advance_signature
+
+
+class StatisticsService:
+    """
+    Агрегаты для экрана статистики.
+
+    Количество по корпусам считает сервер (GROUP BY по открытой колонке campus) и
+    запрашивается заново только после изменений. Количество по отделам (колонка
+    зашифрована) строится один раз и дальше поддерживается по событиям
+    DatabaseManager. Построенная фигура кэшируется до следующего изменения данных.
+    """
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.lock = threading.RLock()
+        self.version = 0
+        self._departments = None
+        self._department_counts = Counter()
+        self._campus_counts = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._figure = None
+        self._figure_version = None
+        db_manager.add_change_listener(self._on_change)
+
+    def close(self):
+        self.db.remove_change_listener(self._on_change)
+        with self.lock:
+            self._figure = None
+
+    # --- инкрементальные обновления ---
+
+    def _on_change(self, event, payload):
+        with self.lock:
+            if event == "upsert" and self._departments is not None:
+                for row in payload:
+                    emp_id, department = row[0], row[3]
+                    old = self._departments.get(emp_id)
+                    self._signature = advance_signature(self._signature, emp_id, old is None)
+                    if old is not None:
+                        self._decrement(old)
+                    self._departments[emp_id] = department
+                    self._department_counts[department] += 1
+            elif event == "remove" and self._departments is not None:
+                removed = 0
+                for emp_id in payload:
+                    old = self._departments.pop(emp_id, None)
+                    if old is not None:
+                        self._decrement(old)
+                        removed += 1
+                if removed:
+                    # Как и в кэше сотрудников: версии удаленных строк неизвестны, сигнатура сверится заново
+                    self._signature = None
+            elif event == "reset":
+                self._departments = None
+            self._campus_counts = None
+            self.version += 1
+
+    def _decrement(self, department):
+        self._department_counts[department] -= 1
+        if self._department_counts[department] <= 0:
+            del self._department_counts[department]
+
+    # --- загрузка ---
+
+    def _load_departments(self):
+        """Расшифровывается только колонка department; если кэш сотрудников уже загружен - берется из него"""
+        signature = self.db._fetch_employees_signature()
+        cache = self.db._employee_cache
+        if cache.loaded and signature is not None and signature == cache.signature:
+            departments = {r[0]: r[3] for r in cache.get_rows()}
+        else:
+            rows = self.db.read_query("SELECT id, department FROM employees", fetchall=True) or []
+            names = self.db.decrypt_many(r['department'] for r in rows)
+            departments = {r['id']: name for r, name in zip(rows, names)}
+        with self.lock:
+            self._departments = departments
+            self._department_counts = Counter(departments.values())
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            self._campus_counts = None
+            self.version += 1
+
+    def _load_campuses(self):
+        rows = self.db.read_query(
+            "SELECT campus, COUNT(*) AS cnt FROM employees GROUP BY campus ORDER BY campus", fetchall=True) or []
+        with self.lock:
+            self._campus_counts = Counter({r['campus']: int(r['cnt']) for r in rows})
+
+    def _is_stale(self):
+        """Раз в EMPLOYEE_CACHE_TTL сверяет сигнатуру с сервером, чтобы заметить чужие изменения"""
+        if self._departments is None:
+            return True
+        if time.monotonic() - self._checked_at < EMPLOYEE_CACHE_TTL:
+            return False
+        signature = self.db._fetch_employees_signature()
+        self._checked_at = time.monotonic()
+        return signature is not None and signature != self._signature
+
+    def counts(self):
+        """Возвращает (по корпусам, по отделам, версия); обращается к БД только при необходимости"""
+        if self._is_stale():
+            self._load_departments()
+        if self._campus_counts is None:
+            self._load_campuses()
+        with self.lock:
+            return Counter(self._campus_counts), Counter(self._department_counts), self.version
+
+    def figure(self, render):
+        """
+        Фигура matplotlib для текущих данных. render(campus_counts, department_counts)
+        вызывается только если данные изменились с прошлого построения.
+        """
+        campus_counts, department_counts, version = self.counts()
+        with self.lock:
+            if self._figure is not None and self._figure_version == version:
+                return self._figure
+        if not department_counts:
+            return None
+        fig = render(campus_counts, department_counts)
+        with self.lock:
+            self._figure = fig
+            self._figure_version = version
+        return fig
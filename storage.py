@@ -0,0 +1,315 @@
+"""
+Движки хранения для DatabaseManager.
+
+Оба движка выдают соединения с интерфейсом pymysql (курсоры со строками-словарями,
+плейсхолдеры %s, begin/commit/rollback/ping), поэтому SQL в DatabaseManager общий.
+Отличаются только подключение, DDL схемы и классы ошибок.
+
+    DB_BACKEND=mysql   - TiDB Cloud / MySQL через pymysql
+    DB_BACKEND=sqlite  - локальный файл SQLITE_PATH (WAL), сервер не нужен
+"""
+import os
+import sqlite3
+from functools import lru_cache
+
+from config import DB_BACKEND, MYSQL_CONFIG, SQLITE_CONFIG, QUERY_CACHE_SIZE
+
+
+class MySQLBackend:
+    name = "mysql"
+    label = "MySQL"
+    # Текущее время сервера для меток изменений (updated_at)
+    now = "CURRENT_TIMESTAMP(6)"
+    # Колонки отслеживания изменений, которые добавляются в уже существующую таблицу employees
+    tracking_columns = {
+        "updated_at": "DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)",
+        "row_version": "INT NOT NULL DEFAULT 1",
+    }
+
+    def __init__(self, config=MYSQL_CONFIG):
+        # pymysql нужен только этому движку
+        import pymysql
+        import pymysql.cursors
+
+        self._pymysql = pymysql
+        self.config = config
+        self.IntegrityError = pymysql.err.IntegrityError
+        self.retryable_errors = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+        self.stream_cursorclass = pymysql.cursors.SSDictCursor
+
+    @property
+    def identity(self):
+        return f"{self.config['host']}:{self.config['port']}/{self.config['database']}"
+
+    def connect(self):
+        print(f"Подключение к TiDB Cloud ({self.config['host']})...")
+        connection = self._pymysql.connect(
+            host=self.config['host'],
+            port=self.config['port'],
+            user=self.config['user'],
+            password=self.config['password'],
+            database=self.config['database'],
+            ssl_ca=self.config['ssl_ca'],
+            charset="utf8mb4",
+            cursorclass=self._pymysql.cursors.DictCursor,
+            autocommit=True
+        )
+        print("Успешное подключение!")
+        return connection
+
+    @staticmethod
+    def ping(conn):
+        conn.ping(reconnect=False)
+
+    # Имена индексов таблицы (для идемпотентных миграций)
+    index_query = ("SELECT DISTINCT INDEX_NAME AS name FROM information_schema.STATISTICS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s")
+
+    def can_retry(self, error):
+        """Соединение оборвалось до отправки запроса - запись безопасно повторить"""
+        code = error.args[0] if error.args else None
+        return code == 2006 or isinstance(error, self._pymysql.err.InterfaceError)
+
+    def schema(self):
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS employees (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                fio TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                department TEXT NOT NULL,
+                position TEXT NOT NULL,
+                campus VARCHAR(100),
+                room VARCHAR(100),
+                updated_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+                row_version INT NOT NULL DEFAULT 1
+            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                username VARCHAR(100) NOT NULL UNIQUE,
+                password_hash VARCHAR(255) NOT NULL,
+                role VARCHAR(50) DEFAULT 'user',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS employee_tombstones (
+                employee_id INT PRIMARY KEY,
+                deleted_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+            );
+            """,
+        ]
+
+    def blind_index_schema(self):
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS employee_bidx (
+                employee_id INT NOT NULL,
+                field VARCHAR(16) NOT NULL,
+                token CHAR(16) NOT NULL,
+                PRIMARY KEY (field, token, employee_id),
+                KEY idx_bidx_employee (employee_id)
+            ) CHARACTER SET ascii;
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS employee_bidx_state (
+                employee_id INT PRIMARY KEY,
+                row_version INT NOT NULL
+            );
+            """,
+        ]
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _qmark(query):
+    """Плейсхолдеры pymysql (%s) в стиле sqlite3 (?); переписывается один раз на текст запроса"""
+    return query.replace("%s", "?")
+
+
+class SQLiteCursor:
+    """Курсор sqlite3 с интерфейсом DictCursor из pymysql"""
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def execute(self, query, params=None):
+        self._cursor.execute(_qmark(query), params or ())
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(_qmark(query), seq_params)
+        self.rowcount = self._cursor.rowcount
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row else None
+
+    def fetchall(self):
+        return [dict(r) for r in self._cursor.fetchall()]
+
+    def fetchmany(self, size):
+        return [dict(r) for r in self._cursor.fetchmany(size)]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Соединение sqlite3 в режиме autocommit, как у pymysql: каждый запрос фиксируется сразу,
+    а begin() открывает явную транзакцию до commit()/rollback().
+    """
+    def __init__(self, raw):
+        self._conn = raw
+        self._conn.row_factory = sqlite3.Row
+
+    def cursor(self, cursorclass=None):
+        # Курсор sqlite3 и так читает строки по мере выборки - отдельный потоковый класс не нужен
+        return SQLiteCursor(self._conn)
+
+    def begin(self):
+        # IMMEDIATE сразу берет блокировку записи и не упирается в SQLITE_BUSY на середине пачки
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+
+    def rollback(self):
+        if self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+
+    def ping(self, reconnect=False):
+        self._conn.execute("SELECT 1")
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend:
+    """
+    Локальная база в одном файле. WAL позволяет читать параллельно с записью,
+    а скомпилированные запросы переиспользуются из кэша каждого соединения
+    (cached_statements), так что повторные запросы не разбираются заново.
+    """
+    name = "sqlite"
+    label = "SQLite"
+    now = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+    # ALTER TABLE в SQLite не принимает вычисляемое значение по умолчанию
+    tracking_columns = {
+        "updated_at": "TEXT NOT NULL DEFAULT '1970-01-01 00:00:00.000'",
+        "row_version": "INTEGER NOT NULL DEFAULT 1",
+    }
+    IntegrityError = sqlite3.IntegrityError
+    # Файл не "отваливается" как сетевое соединение: ошибки не требуют переподключения
+    retryable_errors = ()
+    stream_cursorclass = None
+
+    def __init__(self, path=None, cached_statements=None, busy_timeout=None, synchronous=None):
+        self.path = os.path.abspath(path or SQLITE_CONFIG['path'])
+        self.cached_statements = cached_statements or SQLITE_CONFIG['cached_statements']
+        self.busy_timeout = busy_timeout if busy_timeout is not None else SQLITE_CONFIG['busy_timeout']
+        self.synchronous = synchronous or SQLITE_CONFIG['synchronous']
+
+    @property
+    def identity(self):
+        return f"sqlite:{self.path}"
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        raw = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                              check_same_thread=False, cached_statements=self.cached_statements)
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute(f"PRAGMA synchronous={self.synchronous}")
+        raw.execute("PRAGMA foreign_keys=ON")
+        return SQLiteConnection(raw)
+
+    @staticmethod
+    def ping(conn):
+        conn.ping()
+
+    index_query = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s"
+
+    def can_retry(self, error):
+        return False
+
+    def schema(self):
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS employees (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fio TEXT NOT NULL,
+                phone TEXT NOT NULL,
+                department TEXT NOT NULL,
+                position TEXT NOT NULL,
+                campus TEXT,
+                room TEXT,
+                updated_at TEXT NOT NULL DEFAULT (%s),
+                row_version INTEGER NOT NULL DEFAULT 1
+            )
+            """ % self.now,
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                password_hash TEXT NOT NULL,
+                role TEXT DEFAULT 'user',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS employee_tombstones (
+                employee_id INTEGER PRIMARY KEY,
+                deleted_at TEXT NOT NULL DEFAULT (%s)
+            )
+            """ % self.now,
+        ]
+
+    def blind_index_schema(self):
+        return [
+            """
+            CREATE TABLE IF NOT EXISTS employee_bidx (
+                employee_id INTEGER NOT NULL,
+                field TEXT NOT NULL,
+                token TEXT NOT NULL,
+                PRIMARY KEY (field, token, employee_id)
+            ) WITHOUT ROWID
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_bidx_employee ON employee_bidx (employee_id)",
+            """
+            CREATE TABLE IF NOT EXISTS employee_bidx_state (
+                employee_id INTEGER PRIMARY KEY,
+                row_version INTEGER NOT NULL
+            )
+            """,
+        ]
+
+
+BACKENDS = {
+    MySQLBackend.name: MySQLBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def create_backend(name=None):
+    """Движок по имени (по умолчанию DB_BACKEND из конфигурации)"""
+    name = (name or DB_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Неизвестный движок БД: {name}. Доступны: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
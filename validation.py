@@ -0,0 +1,36 @@
+import re
+
+PHONE_PATTERN = re.compile(r"^\+?[0-9\-\(\)\s]{5,20}$")
+
+
+class EmployeeValidationError(ValueError):
+    """Ошибка проверки полей сотрудника; level - тип сообщения для интерфейса"""
+    def __init__(self, message, level="error"):
+        super().__init__(message)
+        self.level = level
+
+
+def clean_room(room):
+    """Кабинет хранится без пробелов и знаков препинания, в верхнем регистре"""
+    return "".join(c for c in str(room) if c.isalnum()).upper()
+
+
+def validate_employee(fio, phone, department, position, campus, room):
+    """
+    Проверяет и нормализует поля сотрудника. Используется формой редактирования
+    и массовым импортом. Возвращает кортеж очищенных значений.
+    """
+    values = [("" if v is None else str(v)).strip() for v in (fio, phone, department, position, campus, room)]
+    fio, phone, department, position, campus, room = values
+
+    if not all(values):
+        raise EmployeeValidationError("Все поля обязательны для заполнения!")
+
+    if not PHONE_PATTERN.match(phone):
+        raise EmployeeValidationError("Некорректный формат телефона!\nПример: +7(999)123-45-67", "warning")
+
+    room = clean_room(room)
+    if not room:
+        raise EmployeeValidationError("Кабинет не может быть пустым после очистки.")
+
+    return fio, phone, department, position, campus, room
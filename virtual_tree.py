@@ -0,0 +1,305 @@
+import heapq
+from tkinter import ttk
+
+SHIFT_MASK = 0x0001
+CONTROL_MASK = 0x0004
+
+
+def sort_key(value):
+    """Числа сортируются как числа, остальное - как строки без учета регистра"""
+    text = str(value)
+    if text.isdigit():
+        return (0, int(text), "")
+    return (1, 0, text.lower())
+
+
+class VirtualTreeview(ttk.Treeview):
+    """
+    Treeview с виртуальной прокруткой: данные хранятся в списке Python,
+    а элементы Tk создаются только для строк в области просмотра
+    (плюс небольшой запас). Прокрутка, сортировка и фильтрация не зависят
+    от количества записей на стороне Tk.
+    """
+    def __init__(self, master, row_height=45, buffer_rows=2, key_index=0, **kwargs):
+        self._yscrollcommand = kwargs.pop("yscrollcommand", None)
+        super().__init__(master, **kwargs)
+        self.rows = []
+        self.row_height = row_height
+        self.buffer_rows = buffer_rows
+        self.key_index = key_index
+        self.sort_column = None
+        self.sort_reverse = False
+        self._offset = 0
+        self._slots = []
+        self._selected = set()
+
+        self.bind("<Configure>", lambda e: self._render(), add="+")
+        self.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        self.bind("<Button-1>", self._on_click, add="+")
+        self.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        self.bind("<Button-4>", lambda e: self.scroll_rows(-3), add="+")
+        self.bind("<Button-5>", lambda e: self.scroll_rows(3), add="+")
+        self.bind("<Up>", lambda e: self._move_focus(-1))
+        self.bind("<Down>", lambda e: self._move_focus(1))
+        self.bind("<Prior>", lambda e: self._move_focus(-self._visible_count()))
+        self.bind("<Next>", lambda e: self._move_focus(self._visible_count()))
+
+    def configure(self, cnf=None, **kw):
+        if isinstance(cnf, dict) and "yscrollcommand" in cnf:
+            cnf = dict(cnf)
+            kw["yscrollcommand"] = cnf.pop("yscrollcommand")
+        if "yscrollcommand" in kw:
+            self._yscrollcommand = kw.pop("yscrollcommand")
+            self._update_scrollbar()
+            if not kw and not cnf:
+                return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    # --- данные ---
+
+    def set_rows(self, rows):
+        """Заменяет набор данных. Выделение сохраняется для оставшихся записей."""
+        self.rows = list(rows)
+        if self.sort_column is not None:
+            self._sort_rows()
+        keys = {r[self.key_index] for r in self.rows}
+        self._selected &= keys
+        self._render()
+
+    def upsert_row(self, row):
+        """Добавляет или заменяет одну запись. Возвращает прежнюю версию записи или None."""
+        key = row[self.key_index]
+        old = None
+        for i, existing in enumerate(self.rows):
+            if existing[self.key_index] == key:
+                old = existing
+                self.rows[i] = row
+                break
+        else:
+            self.rows.append(row)
+        if self.sort_column is not None:
+            self._sort_rows()
+        self._render()
+        return old
+
+    def remove_keys(self, keys):
+        """Удаляет записи по ключам и возвращает удаленные строки"""
+        keys = set(keys)
+        if not keys:
+            return []
+        removed = [r for r in self.rows if r[self.key_index] in keys]
+        if removed:
+            self.rows = [r for r in self.rows if r[self.key_index] not in keys]
+            self._selected -= keys
+            self._render()
+        return removed
+
+    def sort_by(self, col_index):
+        """Сортирует данные по колонке; повторный вызов меняет направление"""
+        if self.sort_column == col_index:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = col_index
+            self.sort_reverse = False
+        self._sort_rows()
+        self._render()
+
+    def _sort_rows(self):
+        col = self.sort_column
+        self.rows.sort(key=lambda r: sort_key(r[col]), reverse=self.sort_reverse)
+
+    def selected_rows(self):
+        """Все выделенные записи, включая прокрученные за пределы видимой области"""
+        if not self._selected:
+            return []
+        return [r for r in self.rows if r[self.key_index] in self._selected]
+
+    def clear_selection(self):
+        self._selected.clear()
+        super().selection_set(())
+
+    def selection_set(self, *items):
+        if len(items) == 1 and isinstance(items[0], (tuple, list)):
+            items = items[0]
+        self._selected = {self._slot_key(iid) for iid in items if iid in self._slots}
+        return super().selection_set(items)
+
+    def _slot_key(self, iid):
+        return self.rows[self._offset + self._slots.index(iid)][self.key_index]
+
+    # --- прокрутка ---
+
+    def _visible_count(self):
+        height = self.winfo_height()
+        if height <= 1:
+            return 20
+        return max(1, height // self.row_height)
+
+    def _max_offset(self):
+        return max(0, len(self.rows) - self._visible_count())
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self._max_offset()))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def scroll_rows(self, delta):
+        self.scroll_to(self._offset + delta)
+        return "break"
+
+    def yview(self, *args):
+        if not args:
+            return self._fractions()
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                step *= self._visible_count()
+            self.scroll_rows(step)
+        return None
+
+    def _on_mousewheel(self, event):
+        return self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _fractions(self):
+        total = len(self.rows)
+        if total == 0:
+            return (0.0, 1.0)
+        first = self._offset / total
+        last = min(1.0, (self._offset + self._visible_count()) / total)
+        return (first, last)
+
+    def _update_scrollbar(self):
+        if self._yscrollcommand:
+            self._yscrollcommand(*self._fractions())
+
+    # --- отрисовка ---
+
+    def _render(self):
+        self._offset = max(0, min(self._offset, self._max_offset()))
+        count = max(0, min(len(self.rows) - self._offset, self._visible_count() + self.buffer_rows))
+
+        while len(self._slots) < count:
+            self._slots.append(super().insert("", "end"))
+        if len(self._slots) > count:
+            super().delete(*self._slots[count:])
+            del self._slots[count:]
+
+        selected = []
+        for i, iid in enumerate(self._slots):
+            row = self.rows[self._offset + i]
+            super().item(iid, values=row)
+            if row[self.key_index] in self._selected:
+                selected.append(iid)
+        super().selection_set(selected)
+        super().yview_moveto(0)
+        self._update_scrollbar()
+
+    def _on_select(self, event=None):
+        current = set(super().selection())
+        for i, iid in enumerate(self._slots):
+            key = self.rows[self._offset + i][self.key_index]
+            if iid in current:
+                self._selected.add(key)
+            else:
+                self._selected.discard(key)
+
+    def _on_click(self, event):
+        # Обычный клик заменяет выделение, в том числе невидимые строки
+        if not event.state & (SHIFT_MASK | CONTROL_MASK) and self.identify_row(event.y):
+            self._selected.clear()
+
+    def _move_focus(self, delta):
+        if not self.rows:
+            return "break"
+        focus = super().focus()
+        pos = self._offset + self._slots.index(focus) if focus in self._slots else self._offset
+        target = max(0, min(len(self.rows) - 1, pos + delta))
+        visible = self._visible_count()
+        if target < self._offset:
+            self._offset = target
+        elif target >= self._offset + visible:
+            self._offset = target - visible + 1
+        self._render()
+        iid = self._slots[target - self._offset]
+        self.selection_set(iid)
+        super().focus(iid)
+        return "break"
+
+
+class ColumnAutosizer:
+    """
+    Подбор ширины колонок по данным Python, без обращения к элементам Treeview.
+    Результаты font.measure кэшируются по (шрифт, строка). Для больших наборов
+    измеряются только самые длинные значения каждой колонки.
+    """
+    def __init__(self, headers, body_font, header_font, padding=25,
+                 sample_threshold=5000, sample_size=200, cache_limit=200000):
+        self.headers = list(headers)
+        self.body_font = body_font
+        self.header_font = header_font
+        self.padding = padding
+        self.sample_threshold = sample_threshold
+        self.sample_size = sample_size
+        self.cache_limit = cache_limit
+        self._cache = {}
+        self._max_widths = None
+        self._dirty = True
+
+    def measure(self, font, text):
+        key = (str(font), text)
+        width = self._cache.get(key)
+        if width is None:
+            if len(self._cache) >= self.cache_limit:
+                self._cache.clear()
+            width = font.measure(text)
+            self._cache[key] = width
+        return width
+
+    def _cell_width(self, value):
+        return self.measure(self.body_font, str(value)) + self.padding
+
+    def compute(self, rows):
+        """Полный пересчет ширин по набору строк"""
+        widths = []
+        sample = len(rows) > self.sample_threshold
+        for col_index, header in enumerate(self.headers):
+            values = {str(r[col_index]) for r in rows}
+            if sample and len(values) > self.sample_size:
+                values = heapq.nlargest(self.sample_size, values, key=len)
+            width = self.measure(self.header_font, header) + self.padding
+            for value in values:
+                width = max(width, self.measure(self.body_font, value) + self.padding)
+            widths.append(width)
+        self._max_widths = widths
+        self._dirty = False
+        return list(widths)
+
+    def add_rows(self, rows):
+        if self._max_widths is None:
+            return
+        for row in rows:
+            for col_index, value in enumerate(row[:len(self.headers)]):
+                width = self._cell_width(value)
+                if width > self._max_widths[col_index]:
+                    self._max_widths[col_index] = width
+
+    def remove_rows(self, rows):
+        """Если удалена самая широкая ячейка колонки, ширины будут пересчитаны"""
+        if self._max_widths is None:
+            return
+        for row in rows:
+            for col_index, value in enumerate(row[:len(self.headers)]):
+                if self._cell_width(value) >= self._max_widths[col_index]:
+                    self._dirty = True
+                    return
+
+    def widths(self, rows):
+        """Текущие ширины; пересчет только если они устарели"""
+        if self._dirty or self._max_widths is None:
+            return self.compute(rows)
+        return list(self._max_widths)
@@ -0,0 +1,114 @@
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundWorker:
+    """
+    Выполняет обращения к БД в фоновых потоках.
+    Результаты возвращаются в поток Tk через after(), поэтому колбэки
+    могут свободно работать с виджетами.
+    """
+    def __init__(self, root, max_workers=1, poll_interval=30, on_busy_change=None):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self.poll_interval = poll_interval
+        self.on_busy_change = on_busy_change
+        self._results = queue.Queue()
+        self._generations = {}
+        self._futures = {}
+        self._pending = 0
+        self._poll_id = None
+        self._closed = False
+
+    @property
+    def busy(self):
+        return self._pending > 0
+
+    def submit(self, func, *args, key=None, on_success=None, on_error=None, **kwargs):
+        """
+        Ставит задачу в очередь. Если указан key, более старая задача с тем же
+        ключом отменяется, а ее результат (если она уже выполняется) будет отброшен.
+        """
+        if self._closed:
+            return None
+
+        generation = None
+        if key is not None:
+            self.cancel(key)
+            generation = self._generations[key]
+
+        future = self.executor.submit(func, *args, **kwargs)
+        if key is not None:
+            self._futures[key] = future
+
+        self._pending += 1
+        if self._pending == 1:
+            self._notify_busy(True)
+        future.add_done_callback(lambda f: self._results.put((key, generation, f, on_success, on_error)))
+        self._schedule_poll()
+        return future
+
+    def cancel(self, key):
+        """Отменяет задачу с указанным ключом; ее результат не будет доставлен"""
+        self._generations[key] = self._generations.get(key, 0) + 1
+        previous = self._futures.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.root.after(self.poll_interval, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        if self._closed:
+            return
+        while True:
+            try:
+                key, generation, future, on_success, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if key is not None and self._futures.get(key) is future:
+                del self._futures[key]
+            if future.cancelled():
+                continue
+            if key is not None and generation != self._generations.get(key):
+                continue
+            self._dispatch(future, on_success, on_error)
+
+        if self._pending > 0:
+            self._schedule_poll()
+        else:
+            self._notify_busy(False)
+
+    def _dispatch(self, future, on_success, on_error):
+        error = future.exception()
+        try:
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                else:
+                    print(f"Ошибка фоновой задачи: {error}")
+            elif on_success:
+                on_success(future.result())
+        except Exception:
+            traceback.print_exc()
+
+    def _notify_busy(self, busy):
+        if self.on_busy_change:
+            try:
+                self.on_busy_change(busy)
+            except Exception:
+                pass
+
+    def shutdown(self):
+        self._closed = True
+        if self._poll_id is not None:
+            try:
+                self.root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        self.executor.shutdown(wait=False, cancel_futures=True)